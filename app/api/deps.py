@@ -1,12 +1,62 @@
 """Dependencies for API endpoints."""
-from fastapi import Depends, HTTPException, status
-from typing import Optional
-from sqlmodel import Session
+import threading
+import time
+from fastapi import Depends, HTTPException, Query, status
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Optional, Tuple
+from sqlmodel import Session, select
+from sqlalchemy.orm import selectinload
 
+from app.core.config import settings
+from app.core.exceptions import ForbiddenError
 from app.models.auth import UserInDB
-from app.db.session import get_session
+from app.db.session import get_read_session
 from app.db.models import User
 
+# Rôles autorisés à gérer les contenus (matières, documents, challenges)
+_TEACHER_ROLES = frozenset({"teacher", "admin"})
+_TEACHER_ROLE_REQUIRED = "You don't have permission to access this resource. Teacher or admin role required."
+
+# Utilisateurs résolus récemment : user_id -> (expiration monotonic, UserInDB immuable).
+# Les utilisateurs introuvables ne sont jamais mis en cache.
+_USER_CACHE_MAXSIZE = 4096
+_user_cache: Dict[int, Tuple[float, UserInDB]] = {}
+_user_cache_lock = threading.Lock()
+
+def invalidate_user_cache(user_id: Optional[int] = None) -> None:
+    """
+    Drop a cached user (or every cached user) after it was written.
+    
+    Args:
+        user_id: User ID to forget, None to clear the whole cache
+    """
+    with _user_cache_lock:
+        if user_id is None:
+            _user_cache.clear()
+        else:
+            _user_cache.pop(user_id, None)
+
+def _get_cached_user(user_id: int) -> Optional[UserInDB]:
+    with _user_cache_lock:
+        entry = _user_cache.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del _user_cache[user_id]
+            return None
+        return entry[1]
+
+def _cache_user(user_id: int, user: UserInDB) -> None:
+    now = time.monotonic()
+    with _user_cache_lock:
+        if len(_user_cache) >= _USER_CACHE_MAXSIZE:
+            # Purge paresseuse des entrées expirées, sinon éviction de la plus ancienne
+            for key in [key for key, (expires, _) in _user_cache.items() if expires <= now]:
+                del _user_cache[key]
+            if len(_user_cache) >= _USER_CACHE_MAXSIZE:
+                del _user_cache[next(iter(_user_cache))]
+        _user_cache[user_id] = (now + settings.USER_CACHE_TTL, user)
+
 def get_user_by_id(user_id: int, session: Session) -> Optional[UserInDB]:
     """
     Get user by ID for simple authentication (development only).
@@ -19,7 +69,10 @@ def get_user_by_id(user_id: int, session: Session) -> Optional[UserInDB]:
         UserInDB: User object if found, None otherwise
     """
     try:
-        db_user = session.get(User, user_id)
+        # Rôle et abonnements chargés ensemble : aucun lazy-load lors de la construction
+        db_user = session.exec(
+            select(User).options(selectinload(User.subscriptions)).where(User.id == user_id)
+        ).first()
         if db_user:
             return UserInDB(
                 id=str(db_user.id),
@@ -29,19 +82,25 @@ def get_user_by_id(user_id: int, session: Session) -> Optional[UserInDB]:
                 role=db_user.role,
                 disabled=False,
                 auth_token="simple_auth",
-                subscriptions=db_user.subscriptions or ""
+                subscriptions=tuple(subscription.matiere for subscription in db_user.subscriptions)
             )
     except Exception:
         pass
     return None
 
 async def get_current_user_simple(
-    user_id: int,
-    session: Session = Depends(get_session)
+    user_id: int = Query(..., description="User ID for authentication"),
+    session: Session = Depends(get_read_session)
 ) -> UserInDB:
     """
     Simple authentication using just user ID (for development).
     
+    Use it as a dependency (`Depends(get_current_user_simple)`): FastAPI resolves
+    it once per request and shares the result with every dependant. When
+    USER_CACHE_TTL > 0 (single-worker deployments only, the cache is per process),
+    resolved users are also reused across requests for that many seconds; user
+    writes must call invalidate_user_cache().
+    
     Args:
         user_id: User ID
         session: Database session
@@ -52,10 +111,38 @@ async def get_current_user_simple(
     Raises:
         HTTPException: If user not found
     """
-    user = get_user_by_id(user_id, session)
+    user = _get_cached_user(user_id) if settings.USER_CACHE_TTL > 0 else None
+    if user is not None:
+        return user
+    
+    # Blocking DB lookup: run it in the threadpool so the event loop stays free
+    user = await run_in_threadpool(get_user_by_id, user_id, session)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"User with ID {user_id} not found"
         )
-    return user 
\ No newline at end of file
+    if settings.USER_CACHE_TTL > 0:
+        _cache_user(user_id, user)
+    return user
+
+async def require_teacher_or_admin(
+    current_user: UserInDB = Depends(get_current_user_simple)
+) -> UserInDB:
+    """
+    Ensure the current user has the teacher or admin role.
+    
+    Args:
+        current_user: User resolved from the user_id query parameter
+        
+    Returns:
+        UserInDB: Current user object
+        
+    Raises:
+        ForbiddenError: If the user is neither a teacher nor an admin
+    """
+    if current_user.role not in _TEACHER_ROLES:
+        # Fresh instance per raise: re-raising a shared exception object would keep
+        # chaining tracebacks (and their frames) onto it across requests
+        raise ForbiddenError(_TEACHER_ROLE_REQUIRED)
+    return current_user
@@ -1,93 +1,117 @@
-"""User management routes (simplified)."""
+"""User management routes (simplified).
+
+The handlers are plain (sync) functions on purpose: they only perform blocking
+SQLModel calls, so FastAPI runs them in its threadpool instead of on the event loop.
+"""
 import logging
 from fastapi import APIRouter, Depends, HTTPException, Body
-from typing import List, Optional
-from sqlmodel import select
+from sqlmodel import select, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 
 from app.models.base import ApiResponse
-from app.db.models import User
-from app.db.session import get_session
+from app.models.auth import UserRegisterRequest, SubscriptionsRequest, UserUpdateRequest
+from app.db.models import User, UserSubscription
+from app.db.session import get_read_session, get_write_session
+from app.api.deps import invalidate_user_cache
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Module logger (configured once in app.main)
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/api/users", tags=["Users"])
 
 @router.post("/register")
-async def register_user(
-    username: str = Body(...),
-    email: str = Body(...),
-    role: str = Body(...),
-    subscriptions: Optional[List[str]] = Body(default=[]),
-    session=Depends(get_session)
+def register_user(
+    request: UserRegisterRequest = Body(...),
+    session=Depends(get_write_session)
 ):
     """Register a new user."""
-    logger.info(f"Tentative d'enregistrement d'utilisateur : {username} ({email})")
-    
-    # Vérifier unicité email ou username
-    existing = session.exec(select(User).where(User.email == email)).first()
-    if existing:
-        logger.warning(f"Échec de l'enregistrement : email déjà utilisé ({email})")
-        raise HTTPException(status_code=400, detail="Email déjà utilisé")
+    username, email, role = request.username, request.email, request.role
+    subscriptions = request.subscriptions or []
+    logger.info("user.register", extra={"username": username, "email": email})
     
-    user = User(username=username, email=email, role=role, subscriptions=','.join(subscriptions))
+    # L'unicité de l'email est garantie par l'index unique de la table user
+    user = User(username=username, email=email, role=role)
+    user.subscriptions = [UserSubscription(matiere=matiere) for matiere in dict.fromkeys(subscriptions)]
     session.add(user)
-    session.commit()
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        logger.warning("user.register_duplicate_email", extra={"email": email})
+        raise HTTPException(status_code=400, detail="Email déjà utilisé")
     session.refresh(user)
+    # Un identifiant peut être réattribué (base réinitialisée) : oublier l'ancien utilisateur
+    invalidate_user_cache(user.id)
 
-    logger.info(f"Utilisateur enregistré avec succès : {user.username} (ID: {user.id})")
+    logger.info("user.registered", extra={"username": user.username, "user_id": user.id})
     
     return {"success": True, "message": "Utilisateur enregistré", "data": {"user_id": user.id}}
 
 @router.put("/subscriptions")
-async def update_or_get_subscriptions(
-    user_id: int = Body(...),
-    subscriptions: Optional[List[str]] = Body(default=None),
-    session=Depends(get_session)
+def update_or_get_subscriptions(
+    request: SubscriptionsRequest = Body(...),
+    session=Depends(get_write_session)
 ):
     """Update or get user subscriptions."""
-    logger.info(f"Requête de mise à jour/récupération des abonnements pour user_id={user_id}")
+    user_id, subscriptions = request.user_id, request.subscriptions
+    logger.info("user.subscriptions", extra={"user_id": user_id})
     
-    user = session.get(User, user_id)
+    user = session.exec(
+        select(User).options(selectinload(User.subscriptions)).where(User.id == user_id)
+    ).first()
     if not user:
-        logger.warning(f"Utilisateur non trouvé : ID {user_id}")
+        logger.warning("user.not_found", extra={"user_id": user_id})
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
     
+    current = [subscription.matiere for subscription in user.subscriptions]
+
     if subscriptions is not None:
-        user.subscriptions = ','.join(subscriptions)
-        session.add(user)
+        # N'écrire que la différence entre les abonnements actuels et demandés. L'ordre
+        # d'abonnement est celui des lignes (id) : les abonnements conservés qui suivent
+        # le premier écart d'ordre avec la demande sont recréés après les autres
+        wanted = list(dict.fromkeys(subscriptions))
+        kept = [matiere for matiere in current if matiere in wanted]
+        in_order = 0
+        while in_order < len(kept) and kept[in_order] == wanted[in_order]:
+            in_order += 1
+        to_remove = set(current).difference(wanted[:in_order])
+        if to_remove:
+            session.exec(
+                delete(UserSubscription).where(
+                    UserSubscription.user_id == user.id,
+                    UserSubscription.matiere.in_(to_remove)
+                )
+            )
+        session.add_all([
+            UserSubscription(user_id=user.id, matiere=matiere)
+            for matiere in wanted[in_order:]
+        ])
         session.commit()
-        session.refresh(user)
-        logger.info(f"Abonnements mis à jour pour l'utilisateur {user.username} (ID: {user.id})")
+        invalidate_user_cache(user.id)
+        logger.info("user.subscriptions_updated", extra={"username": user.username, "user_id": user.id})
         return {"success": True, "message": "Abonnements mis à jour", "data": {"subscriptions": subscriptions}}
 
-    current = user.subscriptions.split(',') if user.subscriptions else []
-    logger.info(f"Abonnements récupérés pour l'utilisateur {user.username} (ID: {user.id})")
+    logger.info("user.subscriptions_retrieved", extra={"username": user.username, "user_id": user.id})
     return {"success": True, "message": "Abonnements récupérés", "data": {"subscriptions": current}}
 
 @router.put("/{user_id}")
-async def update_user_info(
+def update_user_info(
     user_id: int,
-    username: Optional[str] = Body(default=None),
-    email: Optional[str] = Body(default=None),
-    role: Optional[str] = Body(default=None),
-    session=Depends(get_session)
+    request: UserUpdateRequest = Body(default_factory=UserUpdateRequest),
+    session=Depends(get_write_session)
 ):
     """Update user information."""
-    logger.info(f"Requête de mise à jour des informations pour user_id={user_id}")
+    username, email, role = request.username, request.email, request.role
+    logger.info("user.update", extra={"user_id": user_id})
     
     user = session.get(User, user_id)
     if not user:
-        logger.warning(f"Utilisateur non trouvé : ID {user_id}")
+        logger.warning("user.not_found", extra={"user_id": user_id})
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
     
-    # Check if email is being updated and ensure uniqueness
+    # Email uniqueness is enforced by the unique index on user.email (checked on commit)
     if email is not None and email != user.email:
-        existing = session.exec(select(User).where(User.email == email)).first()
-        if existing:
-            logger.warning(f"Échec de la mise à jour : email déjà utilisé ({email})")
-            raise HTTPException(status_code=400, detail="Email déjà utilisé")
         user.email = email
     
     # Update other fields if provided
@@ -100,9 +124,15 @@ async def update_user_info(
     # Only commit if there were changes
     if any([username is not None, email is not None, role is not None]):
         session.add(user)
-        session.commit()
+        try:
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            logger.warning("user.update_duplicate_email", extra={"email": email})
+            raise HTTPException(status_code=400, detail="Email déjà utilisé")
         session.refresh(user)
-        logger.info(f"Informations mises à jour pour l'utilisateur {user.username} (ID: {user.id})")
+        invalidate_user_cache(user.id)
+        logger.info("user.updated", extra={"username": user.username, "user_id": user.id})
         
         return {
             "success": True, 
@@ -115,14 +145,15 @@ async def update_user_info(
             }
         }
     else:
-        logger.info(f"Aucune modification pour l'utilisateur {user.username} (ID: {user.id})")
+        logger.info("user.update_noop", extra={"username": user.username, "user_id": user.id})
         return {"success": True, "message": "Aucune modification apportée"}
 
 @router.get("/", response_model=ApiResponse)
-async def list_users(session=Depends(get_session)):
+def list_users(session=Depends(get_read_session)):
     """List all users."""
-    logger.info("Fetching all users")
-    users = session.exec(select(User)).all()
+    logger.info("user.list")
+    # Charger les abonnements de tous les utilisateurs en une seule requête supplémentaire
+    users = session.exec(select(User).options(selectinload(User.subscriptions))).all()
     
     return {
         "success": True,
@@ -134,7 +165,7 @@ async def list_users(session=Depends(get_session)):
                     "username": user.username,
                     "email": user.email,
                     "role": user.role,
-                    "subscriptions": user.subscriptions.split(",") if user.subscriptions else []
+                    "subscriptions": [subscription.matiere for subscription in user.subscriptions]
                 }
                 for user in users
             ]
@@ -1,53 +1,56 @@
 """Routes for challenges management."""
 import logging
+import orjson
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Body
+from fastapi.responses import Response
 from typing import List, Optional
 from datetime import date, datetime
 
-from app.models.base import ApiResponse
+from app.models.base import ApiResponse, now_iso
 from app.models.auth import UserInDB
 from app.models.challenge import ChallengeCreate, ChallengeResponse, ChallengeUserResponse, LeaderboardEntry
-from app.api.deps import get_current_user_simple
+from app.api.deps import get_current_user_simple, require_teacher_or_admin
 from app.core.exceptions import NotFoundError
 from app.services.challenges import creer_challenge, lister_challenges, get_next_challenge_for_matiere, get_today_challenge_for_user
-from app.db.session import get_session
+from app.db.session import get_read_session, get_write_session
 
-# Config du logger
-logging.basicConfig(level=logging.INFO)
+# Logger du module (configuré une seule fois dans app.main)
 logger = logging.getLogger(__name__)
 
-router = APIRouter(tags=["Challenges"])
+router = APIRouter(prefix="/api", tags=["Challenges"])
 
 @router.get("/challenges/today", response_model=ApiResponse)
-async def get_today_challenge(
-    user_id: int = Query(..., description="User ID for authentication"),
-    session=Depends(get_session)
+def get_today_challenge(
+    current_user: UserInDB = Depends(get_current_user_simple),
+    session=Depends(get_read_session)
 ):
     """
     Get today's challenge based on server date and user subscriptions.
     Uses tick logic to determine which challenge should be served today.
+    
+    A plain function (run in the threadpool): the lookups are blocking reads, and
+    only a newly served challenge is recorded, in a short write transaction.
     """
     try:
-        current_user = await get_current_user_simple(user_id, session)
         today = date.today().isoformat()
-        logger.info(f"User {current_user.username} (ID: {user_id}) requesting today's challenge for {today}")
+        logger.info("User %s (ID: %s) requesting today's challenge for %s", current_user.username, current_user.id, today)
         
         # Get today's challenge based on user subscriptions
         today_challenge = get_today_challenge_for_user(current_user.subscriptions, session)
         
         if not today_challenge:
-            logger.warning(f"No challenge available for user {current_user.username} with subscriptions: {current_user.subscriptions}")
+            logger.warning("No challenge available for user %s with subscriptions: %s", current_user.username, current_user.subscriptions)
             return {
                 "success": False,
                 "message": "Aucun challenge disponible pour vos abonnements",
                 "data": {
                     "challenge": None,
-                    "user_subscriptions": current_user.subscriptions.split(',') if current_user.subscriptions else [],
+                    "user_subscriptions": list(current_user.subscriptions),
                     "date": today
                 }
             }
         
-        logger.info(f"Today's challenge served to {current_user.username}: {today_challenge['ref']} from {today_challenge['matiere']}")
+        logger.info("Today's challenge served to %s: %s from %s", current_user.username, today_challenge['ref'], today_challenge['matiere'])
         
         return {
             "success": True,
@@ -61,78 +64,76 @@ async def get_today_challenge(
                     "matiere": today_challenge["matiere"],
                     "matieres": today_challenge["matieres"]
                 },
-                "user_subscriptions": current_user.subscriptions.split(',') if current_user.subscriptions else []
+                "user_subscriptions": list(current_user.subscriptions)
             }
         }
         
     except Exception as e:
-        logger.error(f"Error getting today's challenge for user ID {user_id}: {str(e)}")
+        logger.error("Error getting today's challenge for user ID %s: %s", current_user.id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error retrieving today's challenge: {str(e)}"
         )
 
-@router.get("/challenges", response_model=ApiResponse)
+@router.get("/challenges", responses={200: {"model": ApiResponse}})
 async def get_challenges(
-    user_id: int = Query(..., description="User ID for authentication"),
+    current_user: UserInDB = Depends(get_current_user_simple),
     matiere: Optional[str] = Query(None, description="Filter by subject"),
-    session=Depends(get_session)
+    session=Depends(get_read_session)
 ):
     """
     List all challenges, optionally filtered by subject or date range.
     """
-    current_user = await get_current_user_simple(user_id, session)
-    logger.info(f"Utilisateur {current_user.username} demande la liste des challenges pour la matière: {matiere}")
+    logger.info("Utilisateur %s demande la liste des challenges pour la matière: %s", current_user.username, matiere)
     result = lister_challenges(matiere=matiere, session=session)
-    result["message"] = "Challenges récupérés avec succès"
-    return result
+    # Liste potentiellement longue : sérialisée directement par orjson, sans revalidation
+    # ligne à ligne par response_model (mêmes champs que ApiResponse)
+    return Response(
+        content=orjson.dumps({
+            "success": result["success"],
+            "message": "Challenges récupérés avec succès",
+            "data": result["data"],
+            "timestamp": now_iso(),
+        }),
+        media_type="application/json",
+    )
 
 @router.post("/challenges", response_model=ApiResponse)
 async def create_challenge(
-    user_id: int = Query(..., description="User ID for authentication"),
+    current_user: UserInDB = Depends(require_teacher_or_admin),
     challenge: ChallengeCreate = Body(...),
-    session=Depends(get_session)
+    session=Depends(get_write_session)
 ):
     """
     Create a new challenge for one or more subjects (teacher or admin only).
     """
-    current_user = await get_current_user_simple(user_id, session)
-    
-    # Check if user has teacher or admin role
-    if current_user.role not in ["teacher", "admin"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to access this resource. Teacher or admin role required.",
-        )
-    
-    logger.info(f"Création d'un challenge par {current_user.username} pour la matière : {challenge.matiere}")
+    logger.info("Création d'un challenge par %s pour la matière : %s", current_user.username, challenge.matiere)
     result = creer_challenge(challenge.model_dump(), session=session)
     result["message"] = "Challenge créé avec succès"
-    logger.info(f"Challenge créé avec succès : {result.get('data', {}).get('challenge_id', 'N/A')}")
+    logger.info("Challenge créé avec succès : %s", result.get('data', {}).get('challenge_id', 'N/A'))
     return result
 
 @router.post("/challenges/{challenge_id}/response", response_model=ApiResponse)
 async def submit_challenge_response(
-    user_id: int = Query(..., description="User ID for authentication"),
+    current_user: UserInDB = Depends(get_current_user_simple),
     challenge_id: str = Path(..., description="Challenge ID"),
     response_data: ChallengeUserResponse = Body(...),
-    session=Depends(get_session)
+    session=Depends(get_read_session)
 ):
     """
     Submit a user's response to a specific challenge.
     """
-    current_user = await get_current_user_simple(user_id, session)
-    logger.info(f"Soumission de réponse pour le challenge {challenge_id} par utilisateur {response_data.user_id}")
+    logger.info("Soumission de réponse pour le challenge %s par utilisateur %s", challenge_id, response_data.user_id)
     
     try:
         # Generate a unique question ID for this response
         import uuid
-        from datetime import datetime
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
         short_uuid = str(uuid.uuid4())[:6]
         question_id = f"IDQ-{timestamp}-{short_uuid}"
         
-        # Get the challenge details
+        # Get the challenge details (read-only session: StudentResponseService writes
+        # through its own sessions below)
         from sqlmodel import select
         from app.db.models import Challenge
         challenge = session.exec(select(Challenge).where(Challenge.id == int(challenge_id))).first()
@@ -166,7 +167,7 @@ async def submit_challenge_response(
                 )
                 
                 if response_saved:
-                    logger.info(f"✅ Response saved to database for challenge {challenge_id}")
+                    logger.info("✅ Response saved to database for challenge %s", challenge_id)
                     db_saved = True
                 else:
                     logger.warning("Failed to save response to database, falling back to JSON")
@@ -176,7 +177,7 @@ async def submit_challenge_response(
                 db_saved = False
                 
         except Exception as db_error:
-            logger.warning(f"Database error, falling back to JSON: {db_error}")
+            logger.warning("Database error, falling back to JSON: %s", db_error)
             db_saved = False
         
         # Fallback to JSON if database failed
@@ -204,7 +205,7 @@ async def submit_challenge_response(
                 "user_id": int(current_user.id)
             }
             save_conversations(conversations)
-            logger.info(f"✅ Response saved to JSON for challenge {challenge_id}")
+            logger.info("✅ Response saved to JSON for challenge %s", challenge_id)
         
         # Trigger automatic evaluation (try both systems)
         evaluation_result = None
@@ -224,18 +225,18 @@ async def submit_challenge_response(
             )
             
             if evaluation_result:
-                logger.info(f"✅ Response evaluated for question {question_id}")
+                logger.info("✅ Response evaluated for question %s", question_id)
                 
                 # Try to save evaluation to database first
                 if db_saved:
                     try:
                         evaluation_saved = service.save_evaluation(question_id, evaluation_result)
                         if evaluation_saved:
-                            logger.info(f"✅ Evaluation saved to database for question {question_id}")
+                            logger.info("✅ Evaluation saved to database for question %s", question_id)
                         else:
                             logger.warning("Failed to save evaluation to database")
                     except Exception as eval_db_error:
-                        logger.warning(f"Failed to save evaluation to database: {eval_db_error}")
+                        logger.warning("Failed to save evaluation to database: %s", eval_db_error)
                 
                 # Update JSON with evaluation
                 conversations = load_conversations()
@@ -243,13 +244,13 @@ async def submit_challenge_response(
                     conversations[question_id]['evaluation'] = evaluation_result
                     conversations[question_id]['evaluated'] = True
                     save_conversations(conversations)
-                    logger.info(f"✅ Evaluation saved to JSON for question {question_id}")
+                    logger.info("✅ Evaluation saved to JSON for question %s", question_id)
                 
             else:
-                logger.warning(f"Failed to evaluate response for question {question_id}")
+                logger.warning("Failed to evaluate response for question %s", question_id)
                 
         except Exception as eval_error:
-            logger.warning(f"Evaluation process failed (non-blocking): {eval_error}")
+            logger.warning("Evaluation process failed (non-blocking): %s", eval_error)
         
         return {
             "success": True,
@@ -271,7 +272,7 @@ async def submit_challenge_response(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error submitting challenge response: {str(e)}")
+        logger.error("Error submitting challenge response: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error submitting response: {str(e)}"
@@ -279,15 +280,13 @@ async def submit_challenge_response(
 
 @router.get("/challenges/{challenge_id}/leaderboard", response_model=ApiResponse)
 async def get_challenge_leaderboard(
-    user_id: int = Query(..., description="User ID for authentication"),
-    challenge_id: str = Path(..., description="Challenge ID"),
-    session=Depends(get_session)
+    current_user: UserInDB = Depends(get_current_user_simple),
+    challenge_id: str = Path(..., description="Challenge ID")
 ):
     """
     Get the leaderboard for a specific challenge.
     """
-    current_user = await get_current_user_simple(user_id, session)
-    logger.info(f"Récupération du classement pour le challenge {challenge_id} par {current_user.username}")
+    logger.info("Récupération du classement pour le challenge %s par %s", challenge_id, current_user.username)
     return {
         "success": True,
         "message": "Classement récupéré avec succès",
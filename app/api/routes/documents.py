@@ -1,46 +1,50 @@
 """Routes for document management."""
 import logging
+import os
+import tempfile
 from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form, Path, Query
 from typing import List, Optional
 from datetime import datetime
 from fastapi.responses import FileResponse
-import os
+import pathlib
 
 from app.models.base import ApiResponse
 from app.models.auth import UserInDB
 from app.models.document import DocumentCreate, DocumentResponse, DocumentList
-from app.api.deps import get_current_user_simple
+from app.api.deps import get_current_user_simple, require_teacher_or_admin
 from app.core.exceptions import NotFoundError
 from app.services.rag.documents import (
     delete_document_from_subject,
     get_document_content,
     process_and_index_new_document,
-    initialiser_structure_dossiers
+    initialiser_structure_dossiers,
+    creer_hasheur_fichier,
+    dossier_cible_document
 )
-from app.services.documents import lister_documents, upload_document_with_tracking, get_document_changes_since_last_index, mark_document_as_indexed
+from app.services.documents import lister_documents, get_document_by_ref, upload_document_with_tracking, get_document_changes_since_last_index, mark_document_as_indexed, mark_documents_as_indexed
 from app.services.rag.embeddings import delete_documents
 from app.services.rag.core import initialize_pinecone
-from app.db.session import get_session
+from app.db.session import get_session, get_read_session
 from app.core.config import settings
 
-# Configuration du logger
-logging.basicConfig(level=logging.INFO)
+# Logger du module (configuré une seule fois dans app.main)
 logger = logging.getLogger(__name__)
 
-router = APIRouter(tags=["Documents"])
+router = APIRouter(prefix="/api", tags=["Documents"])
+
+# Taille des blocs lus lors de l'upload d'un document (1 MiB)
+UPLOAD_CHUNK_SIZE = 1 << 20
 
 @router.get("/matieres/{matiere}/documents", response_model=ApiResponse)
 async def get_documents(
-    user_id: int = Query(..., description="User ID for authentication"),
-    matiere: str = Path(..., description="Subject code (e.g. 'MATH')"),
-    session=Depends(get_session)
+    current_user: UserInDB = Depends(get_current_user_simple),
+    matiere: str = Path(..., description="Subject code (e.g. 'MATH')")
 ):
     """
     List all documents for a specific subject.
     """
     try:
-        current_user = await get_current_user_simple(user_id, session)
-        logger.info(f"User {current_user.username} is listing documents for subject {matiere}")
+        logger.info("User %s is listing documents for subject %s", current_user.username, matiere)
         
         # Ensure folder structure exists
         initialiser_structure_dossiers()
@@ -64,7 +68,7 @@ async def get_documents(
             )
         
     except Exception as e:
-        logger.error(f"Error retrieving documents for subject {matiere}: {str(e)}")
+        logger.error("Error retrieving documents for subject %s: %s", matiere, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error retrieving documents: {str(e)}"
@@ -72,7 +76,7 @@ async def get_documents(
 
 @router.post("/matieres/{matiere}/documents", response_model=ApiResponse)
 async def upload_document(
-    user_id: int = Query(..., description="User ID for authentication"),
+    current_user: UserInDB = Depends(require_teacher_or_admin),
     matiere: str = Path(..., description="Subject code (e.g. 'MATH')"),
     file: UploadFile = File(...),
     is_exam: bool = Form(False),
@@ -82,36 +86,45 @@ async def upload_document(
     Upload a new document for a subject (teacher or admin only).
     """
     try:
-        current_user = await get_current_user_simple(user_id, session)
-        
-        # Check if user has teacher or admin role
-        if current_user.role not in ["teacher", "admin"]:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You don't have permission to access this resource. Teacher or admin role required.",
-            )
-        
-        logger.info(f"User {current_user.username} is uploading document {file.filename} for subject {matiere}, is_exam={is_exam}")
+        logger.info("User %s is uploading document %s for subject %s, is_exam=%s", current_user.username, file.filename, matiere, is_exam)
         
         # Ensure folder structure exists
         initialiser_structure_dossiers()
         
-        # Read file content
-        file_content = await file.read()
-        
-        if not file_content:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="File is empty"
-            )
-        
-        # Upload the document with database tracking
-        success, message, document_info = upload_document_with_tracking(
-            matiere=matiere,
-            filename=file.filename,
-            file_content=file_content,
-            is_exam=is_exam
+        # Stream the upload to a temporary file in the target folder, hashing it on the fly:
+        # neither held in memory nor re-read from disk, then moved into place (os.replace)
+        hasher = creer_hasheur_fichier()
+        file_size = 0
+        fd, temp_path = tempfile.mkstemp(
+            dir=dossier_cible_document(matiere, is_exam), prefix=".upload-", suffix=".part"
         )
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    hasher.update(chunk)
+                    temp_file.write(chunk)
+                    file_size += len(chunk)
+            # mkstemp crée le fichier en 0600 : droits habituels d'un document déposé
+            os.chmod(temp_path, 0o644)
+            
+            if not file_size:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="File is empty"
+                )
+            
+            # Upload the document with database tracking
+            success, message, document_info = upload_document_with_tracking(
+                matiere=matiere,
+                filename=file.filename,
+                is_exam=is_exam,
+                precomputed_hash=hasher.hexdigest(),
+                uploaded_path=temp_path
+            )
+        finally:
+            # Still there if the upload was rejected (empty, duplicate, unsupported type)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
         
         if not success:
             raise HTTPException(
@@ -137,21 +150,20 @@ async def upload_document(
             )
             
             if index_success:
-                logger.info(f"Document {file.filename} successfully indexed into vector database")
+                logger.info("Document %s successfully indexed into vector database", file.filename)
                 message += f". Document indexed successfully: {index_message}"
                 
                 # If indexing was successful, mark document as indexed in database
                 try:
-                    with next(get_session()) as db_session:
-                        mark_document_as_indexed(db_session, document_info["file_hash"])
+                    mark_document_as_indexed(session, document_info["file_hash"])
                 except Exception as db_error:
-                    logger.warning(f"Document indexed but failed to update database: {db_error}")
+                    logger.warning("Document indexed but failed to update database: %s", db_error)
             else:
-                logger.warning(f"Document uploaded but indexing failed: {index_message}")
+                logger.warning("Document uploaded but indexing failed: %s", index_message)
                 message += f". Warning - indexing failed: {index_message}"
                 
         except Exception as index_error:
-            logger.error(f"Error during automatic indexing: {str(index_error)}")
+            logger.error("Error during automatic indexing: %s", index_error)
             message += f". Warning - indexing error: {str(index_error)}"
         
         return {
@@ -166,7 +178,7 @@ async def upload_document(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error uploading document {file.filename} for subject {matiere}: {str(e)}")
+        logger.error("Error uploading document %s for subject %s: %s", file.filename, matiere, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error uploading document: {str(e)}"
@@ -174,25 +186,15 @@ async def upload_document(
 
 @router.delete("/matieres/{matiere}/documents/{document_id}", response_model=ApiResponse)
 async def delete_document(
-    user_id: int = Query(..., description="User ID for authentication"),
+    current_user: UserInDB = Depends(require_teacher_or_admin),
     matiere: str = Path(..., description="Subject code (e.g. 'MATH')"),
-    document_id: str = Path(..., description="Document ID"),
-    session=Depends(get_session)
+    document_id: str = Path(..., description="Document ID")
 ):
     """
     Delete a document from a subject (teacher or admin only).
     """
     try:
-        current_user = await get_current_user_simple(user_id, session)
-        
-        # Check if user has teacher or admin role
-        if current_user.role not in ["teacher", "admin"]:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You don't have permission to access this resource. Teacher or admin role required.",
-            )
-        
-        logger.info(f"User {current_user.username} is deleting document {document_id} from subject {matiere}")
+        logger.info("User %s is deleting document %s from subject %s", current_user.username, document_id, matiere)
         
         # First, get document info before deletion (for vector database cleanup)
         result = lister_documents(matiere)
@@ -247,11 +249,11 @@ async def delete_document(
                     file_paths=[target_document["file_path"]]
                 )
                 if vector_delete_success:
-                    logger.info(f"Document {target_document['filename']} successfully removed from vector database")
+                    logger.info("Document %s successfully removed from vector database", target_document['filename'])
                 else:
-                    logger.warning(f"Document {target_document['filename']} deleted from filesystem but may still exist in vector database")
+                    logger.warning("Document %s deleted from filesystem but may still exist in vector database", target_document['filename'])
             except Exception as e:
-                logger.error(f"Error removing document from vector database: {str(e)}")
+                logger.error("Error removing document from vector database: %s", e)
         
         return {
             "success": True,
@@ -265,7 +267,7 @@ async def delete_document(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error deleting document {document_id} from subject {matiere}: {str(e)}")
+        logger.error("Error deleting document %s from subject %s: %s", document_id, matiere, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error deleting document: {str(e)}"
@@ -273,10 +275,10 @@ async def delete_document(
 
 @router.get("/matieres/{matiere}/documents/{document_id}/content", response_class=FileResponse)
 async def get_document_file_endpoint(
-    user_id: int = Query(..., description="User ID for authentication"),
+    current_user: UserInDB = Depends(get_current_user_simple),
     matiere: str = Path(..., description="Subject code (e.g. 'MATH')"),
     document_id: str = Path(..., description="Document ID (numeric id or file hash)"),
-    session=Depends(get_session)
+    session=Depends(get_read_session)
 ):
     """
     Serve the **raw file** for the requested document so the caller can download it.
@@ -284,51 +286,35 @@ async def get_document_file_endpoint(
     `file_hash`. The function resolves the hash and then returns a `FileResponse`.
     """
     try:
-        current_user = await get_current_user_simple(user_id, session)
         logger.info(
-            f"User {current_user.username} is downloading document {document_id} in subject {matiere}"
+            "User %s is downloading document %s in subject %s", current_user.username, document_id, matiere
         )
 
-        # Resolve numeric id → file_hash if necessary
-        file_hash_param = str(document_id)
-        try:
-            list_result = lister_documents(matiere)
-            if list_result.get("success"):
-                for d in list_result["data"]:
-                    if str(d["id"]) == str(document_id):
-                        file_hash_param = d["file_hash"]
-                        break
-        except Exception:
-            pass
-
-        # Find document data
-        doc_path = None
-        filename = None
-        list_result = lister_documents(matiere)
-        if not list_result.get("success"):
-            raise HTTPException(status_code=500, detail="Unable to list documents")
-
-        for d in list_result["data"]:
-            if d["file_hash"] == file_hash_param:
-                doc_path = os.path.join(settings.COURS_DIR, d["file_path"])
-                filename = d["filename"]
-                break
+        # Resolve the document (numeric id or file hash) with a single query
+        document = get_document_by_ref(session, matiere, str(document_id))
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
 
-        if not doc_path or not os.path.exists(doc_path):
+        # Stat the file once and hand the result to FileResponse so it does not stat again
+        doc_path = pathlib.Path(settings.COURS_DIR) / document.file_path
+        try:
+            stat_result = doc_path.stat()
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail="Document not found")
 
         # Return the file as attachment
         return FileResponse(
             path=doc_path,
-            filename=filename,
+            filename=document.filename,
             media_type="application/octet-stream",
+            stat_result=stat_result,
         )
 
     except HTTPException:
         raise
     except Exception as e:
         logger.error(
-            f"Error sending file for document {document_id} in subject {matiere}: {str(e)}"
+            "Error sending file for document %s in subject %s: %s", document_id, matiere, e
         )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -337,25 +323,18 @@ async def get_document_file_endpoint(
 
 @router.post("/matieres/{matiere}/documents/reindex", response_model=ApiResponse)
 async def reindex_subject_documents(
-    user_id: int = Query(..., description="User ID for authentication"),
+    current_user: UserInDB = Depends(require_teacher_or_admin),
     matiere: str = Path(..., description="Subject code (e.g. 'MATH')"),
+    force: bool = Query(False, description="Re-index every document, not only new or modified ones"),
     session=Depends(get_session)
 ):
     """
-    Manually trigger re-indexing of all documents for a subject (teacher or admin only).
-    Useful for maintenance or after system updates.
+    Manually trigger re-indexing of the documents of a subject (teacher or admin only).
+    By default only documents that are new or modified since the last indexing are
+    processed; pass `force=true` to re-index everything (maintenance, system updates).
     """
     try:
-        current_user = await get_current_user_simple(user_id, session)
-        
-        # Check if user has teacher or admin role
-        if current_user.role not in ["teacher", "admin"]:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You don't have permission to access this resource. Teacher or admin role required.",
-            )
-        
-        logger.info(f"User {current_user.username} is triggering re-indexing for subject {matiere}")
+        logger.info("User %s is triggering re-indexing for subject %s", current_user.username, matiere)
         
         # Get all documents for the subject from database
         result = lister_documents(matiere)
@@ -368,6 +347,27 @@ async def reindex_subject_documents(
         
         documents = result["data"]
         
+        if documents and not force:
+            # Only re-embed documents that changed since the last indexing
+            changes = get_document_changes_since_last_index(matiere)
+            if changes["success"]:
+                changed_hashes = set(changes["data"]["unindexed"]) | set(changes["data"]["modified"])
+                documents = [doc for doc in documents if doc["file_hash"] in changed_hashes]
+            else:
+                logger.warning("Could not compute document changes for %s, re-indexing everything: %s", matiere, changes.get('message'))
+            
+            if not documents:
+                return {
+                    "success": True,
+                    "message": f"Re-indexing completed. No new or modified documents for subject {matiere}",
+                    "data": {
+                        "processed_count": 0,
+                        "success_count": 0,
+                        "failed_count": 0,
+                        "details": []
+                    }
+                }
+        
         if not documents:
             return {
                 "success": True,
@@ -383,10 +383,11 @@ async def reindex_subject_documents(
         indexing_results = []
         success_count = 0
         failed_count = 0
+        successful_hashes = []
         
         for document in documents:
             try:
-                logger.info(f"Re-indexing document: {document['filename']}")
+                logger.info("Re-indexing document: %s", document['filename'])
                 
                 # Map database document format to expected format for indexing
                 document_info = {
@@ -404,13 +405,9 @@ async def reindex_subject_documents(
                     document_info=document_info
                 )
                 
-                # If indexing was successful, mark document as indexed in database
+                # If indexing was successful, remember it so all documents are marked at once
                 if index_success:
-                    try:
-                        with next(get_session()) as db_session:
-                            mark_document_as_indexed(db_session, document["file_hash"])
-                    except Exception as db_error:
-                        logger.warning(f"Document indexed but failed to update database: {db_error}")
+                    successful_hashes.append(document["file_hash"])
                 
                 result = {
                     "document_id": document["id"],
@@ -423,15 +420,15 @@ async def reindex_subject_documents(
                 
                 if index_success:
                     success_count += 1
-                    logger.info(f"Successfully re-indexed: {document['filename']}")
+                    logger.info("Successfully re-indexed: %s", document['filename'])
                 else:
                     failed_count += 1
-                    logger.warning(f"Failed to re-index {document['filename']}: {index_message}")
+                    logger.warning("Failed to re-index %s: %s", document['filename'], index_message)
                     
             except Exception as doc_error:
                 failed_count += 1
                 error_msg = f"Error processing document: {str(doc_error)}"
-                logger.error(f"Error re-indexing {document['filename']}: {error_msg}")
+                logger.error("Error re-indexing %s: %s", document['filename'], error_msg)
                 
                 indexing_results.append({
                     "document_id": document["id"],
@@ -440,6 +437,13 @@ async def reindex_subject_documents(
                     "message": error_msg
                 })
         
+        if successful_hashes:
+            try:
+                mark_documents_as_indexed(session, successful_hashes)
+            except Exception as db_error:
+                session.rollback()
+                logger.warning("Documents indexed but failed to update database: %s", db_error)
+        
         return {
             "success": True,
             "message": f"Re-indexing completed. {success_count} successful, {failed_count} failed",
@@ -454,7 +458,7 @@ async def reindex_subject_documents(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error during re-indexing for subject {matiere}: {str(e)}")
+        logger.error("Error during re-indexing for subject %s: %s", matiere, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error during re-indexing: {str(e)}"
@@ -462,16 +466,14 @@ async def reindex_subject_documents(
 
 @router.get("/matieres/{matiere}/documents/changes", response_model=ApiResponse)
 async def get_document_changes(
-    user_id: int = Query(..., description="User ID for authentication"),
-    matiere: str = Path(..., description="Subject code (e.g. 'MATH')"),
-    session=Depends(get_session)
+    current_user: UserInDB = Depends(get_current_user_simple),
+    matiere: str = Path(..., description="Subject code (e.g. 'MATH')")
 ):
     """
     Get documents that have changed since last indexing (new or modified).
     """
     try:
-        current_user = await get_current_user_simple(user_id, session)
-        logger.info(f"User {current_user.username} is checking document changes for subject {matiere}")
+        logger.info("User %s is checking document changes for subject %s", current_user.username, matiere)
         
         # Get document changes
         result = get_document_changes_since_last_index(matiere)
@@ -489,7 +491,7 @@ async def get_document_changes(
             )
         
     except Exception as e:
-        logger.error(f"Error checking document changes for subject {matiere}: {str(e)}")
+        logger.error("Error checking document changes for subject %s: %s", matiere, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error checking document changes: {str(e)}"
@@ -1,4 +1,5 @@
 """Routes for subject (matière) management."""
+import asyncio
 import logging
 from fastapi import APIRouter, Depends, HTTPException, status, Body, Query, Path
 from typing import List, Optional
@@ -6,39 +7,42 @@ from typing import List, Optional
 from app.models.base import ApiResponse
 from app.models.auth import UserInDB
 from app.models.matiere import MatiereCreate, MatiereResponse, MatiereList
-from app.api.deps import get_current_user_simple
+from app.api.deps import get_current_user_simple, require_teacher_or_admin
+from app.db.session import get_read_session
 from app.core.exceptions import NotFoundError
-from app.db.session import get_session
 from app.services import matieres
 
-# Configuration du logger
-logging.basicConfig(level=logging.INFO)
+# Logger du module (configuré une seule fois dans app.main)
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/matieres", tags=["Matières"])
+router = APIRouter(prefix="/api/matieres", tags=["Matières"])
 
 @router.get("/", response_model=ApiResponse)
 async def get_matieres(
-    user_id: int = Query(..., description="User ID for authentication"),
-    session=Depends(get_session)
+    current_user: UserInDB = Depends(get_current_user_simple),
+    details: bool = Query(False, description="Include document count and last update of each subject"),
+    session=Depends(get_read_session)
 ):
     """
     List all available subjects by scanning the cours directory.
     """
-    current_user = await get_current_user_simple(user_id, session)
-    logger.info(f"[{current_user.username}] Requête de récupération des matières.")
+    logger.info("matiere.list", extra={"user": current_user.username})
     
-    # Utiliser le service pour scanner les dossiers
-    result = matieres.lister_matieres()
+    # Utiliser le service pour scanner les dossiers (hors de la boucle d'événements)
+    result = await asyncio.to_thread(matieres.lister_matieres)
     
     if result["success"]:
+        data = {"matieres": result["data"]}
+        if details:
+            # Une requête groupée pour toutes les matières plutôt qu'une par matière
+            data["details"] = await asyncio.to_thread(matieres.batch_info_matieres, session, result["data"])
         return {
             "success": True,
             "message": "Matières récupérées avec succès",
-            "data": {"matieres": result["data"]}
+            "data": data
         }
     else:
-        logger.error(f"Erreur lors de la récupération des matières: {result.get('message', 'Erreur inconnue')}")
+        logger.error("matiere.list_failed", extra={"error": result.get('message', 'Erreur inconnue')})
         return {
             "success": False,
             "message": result.get("message", "Erreur lors de la récupération des matières"),
@@ -47,37 +51,19 @@ async def get_matieres(
 
 @router.post("/", response_model=ApiResponse)
 async def create_matiere(
-    user_id: int = Query(..., description="User ID for authentication"),
-    matiere: MatiereCreate = Body(...),
-    session=Depends(get_session)
+    current_user: UserInDB = Depends(require_teacher_or_admin),
+    matiere: MatiereCreate = Body(...)
 ):
     """
     Create a new subject with its folder structure (teacher or admin only).
     """
-    current_user = await get_current_user_simple(user_id, session)
+    logger.info("matiere.create", extra={"user": current_user.username, "matiere": matiere.name})
     
-    # Check if user has teacher or admin role
-    if current_user.role not in ["teacher", "admin"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to access this resource. Teacher or admin role required.",
-        )
-    
-    logger.info(f"[{current_user.username}] Création de la matière '{matiere.name}'.")
-    
-    # Utiliser le service pour créer la structure de dossiers
-    result = matieres.initialiser_structure_dossiers(matiere.name)
+    # Écritures disque bloquantes : exécutées hors de la boucle d'événements
+    result = await asyncio.to_thread(matieres.initialiser_structure_dossiers, matiere.name)
     
     if result["success"]:
-        # Obtenir les infos détaillées de la matière créée
-        info_result = matieres.obtenir_info_matiere(matiere.name)
-        matiere_info = info_result["data"] if info_result["success"] else {
-            "name": matiere.name,
-            "description": matiere.description,
-            "document_count": 0,
-            "last_update": None
-        }
-        
+        # Matière tout juste créée : seul le README existe, aucun document à compter
         return {
             "success": True,
             "message": result["message"],
@@ -85,8 +71,8 @@ async def create_matiere(
                 "matiere": {
                     "name": matiere.name,
                     "description": matiere.description,
-                    "document_count": matiere_info.get("document_count", 0),
-                    "last_update": matiere_info.get("last_update"),
+                    "document_count": 0,
+                    "last_update": None,
                     "path": result["data"]["path"]
                 }
             }
@@ -105,18 +91,16 @@ async def create_matiere(
 
 @router.get("/{matiere_name}", response_model=ApiResponse)
 async def get_matiere_info(
-    user_id: int = Query(..., description="User ID for authentication"),
-    matiere_name: str = Path(..., description="Subject name"),
-    session=Depends(get_session)
+    current_user: UserInDB = Depends(get_current_user_simple),
+    matiere_name: str = Path(..., description="Subject name")
 ):
     """
     Get detailed information about a specific subject.
     """
-    current_user = await get_current_user_simple(user_id, session)
-    logger.info(f"[{current_user.username}] Récupération des infos de la matière '{matiere_name}'.")
+    logger.info("matiere.info", extra={"user": current_user.username, "matiere": matiere_name})
     
     # Utiliser le service pour obtenir les infos
-    result = matieres.obtenir_info_matiere(matiere_name)
+    result = await asyncio.to_thread(matieres.obtenir_info_matiere, matiere_name)
     
     if result["success"]:
         return {
@@ -132,26 +116,16 @@ async def get_matiere_info(
 
 @router.delete("/{matiere_name}", response_model=ApiResponse)
 async def delete_matiere(
-    user_id: int = Query(..., description="User ID for authentication"),
-    matiere_name: str = Path(..., description="Subject name to delete"),
-    session=Depends(get_session)
+    current_user: UserInDB = Depends(require_teacher_or_admin),
+    matiere_name: str = Path(..., description="Subject name to delete")
 ):
     """
     Delete a subject and all its documents (teacher or admin only).
     """
-    current_user = await get_current_user_simple(user_id, session)
-    
-    # Check if user has teacher or admin role
-    if current_user.role not in ["teacher", "admin"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to access this resource. Teacher or admin role required.",
-        )
-    
-    logger.info(f"[{current_user.username}] Suppression de la matière '{matiere_name}'.")
+    logger.info("matiere.delete", extra={"user": current_user.username, "matiere": matiere_name})
     
     # Utiliser le service pour supprimer la matière
-    result = matieres.supprimer_matiere(matiere_name)
+    result = await asyncio.to_thread(matieres.supprimer_matiere, matiere_name)
     
     if result["success"]:
         return {
@@ -1,6 +1,7 @@
 """Routes for questions management."""
+import asyncio
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Body
 from datetime import datetime
 
 from app.models.base import ApiResponse
@@ -8,29 +9,34 @@ from app.models.auth import UserInDB
 from app.models.question import ReflectionQuestionRequest
 from app.api.deps import get_current_user_simple
 from app.services.rag.questions import generer_question_reflexion
-from app.db.session import get_session
+from app.services.rag.batching import question_batcher
 
-# Config du logger
-logging.basicConfig(level=logging.INFO)
+# Logger du module (configuré une seule fois dans app.main)
 logger = logging.getLogger(__name__)
 
-router = APIRouter(tags=["Questions"])
+router = APIRouter(prefix="/api", tags=["Questions"])
 
 @router.post("/question/reflection", response_model=ApiResponse)
 async def generate_reflection_question(
-    user_id: int = Query(..., description="User ID for authentication"),
-    request: ReflectionQuestionRequest = Body(...),
-    session=Depends(get_session)
+    current_user: UserInDB = Depends(get_current_user_simple),
+    request: ReflectionQuestionRequest = Body(...)
 ):
     """
     Génère une question de réflexion sur un concept donné.
     """
-    current_user = await get_current_user_simple(user_id, session)
-    
-    logger.info(f"Génération de question de réflexion par {current_user.username} pour le concept: {request.concept_cle} en {request.matiere}")
+    logger.info("question.reflection", extra={"user": current_user.username, "concept": request.concept_cle, "matiere": request.matiere})
     
     try:
-        result = generer_question_reflexion(request.matiere, request.concept_cle)
+        # Recherche du contexte regroupée avec les requêtes concurrentes de la même matière
+        context = None
+        if request.concept_cle and request.concept_cle.strip():
+            try:
+                context = await question_batcher.retrieve_context(request.matiere, request.concept_cle.strip())
+            except Exception as e:
+                logger.warning("question.context_batch_failed", extra={"error": str(e)})
+        
+        # Appels OpenAI bloquants : exécutés dans un thread pour ne pas bloquer la boucle
+        result = await asyncio.to_thread(generer_question_reflexion, request.matiere, request.concept_cle, context)
         
         # If result is successful, add user info
         if isinstance(result, dict) and not result.get("error"):
@@ -46,7 +52,7 @@ async def generate_reflection_question(
         }
     
     except Exception as e:
-        logger.error(f"Erreur lors de la génération de la question: {str(e)}")
+        logger.error("question.reflection_failed", extra={"error": str(e)})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erreur lors de la génération de la question: {str(e)}"
@@ -0,0 +1,79 @@
+"""Process bootstrap: environment loading and logging setup, each done once."""
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from app.core.logging_config import JsonFormatter, TextFormatter
+
+# Get the root directory of the project
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+env_path = ROOT_DIR / ".env"
+
+_env_loaded = False
+_log_queue: Optional[queue.SimpleQueue] = None
+_log_listener: Optional[QueueListener] = None
+
+def load_environment() -> None:
+    """
+    Load the .env file into os.environ (first call only).
+    
+    Set SKIP_DOTENV=1 when the environment is injected by the platform (e.g. a
+    container started with --env-file): the file is then neither required nor read.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    
+    if os.getenv("SKIP_DOTENV") != "1":
+        if not env_path.exists():
+            raise FileNotFoundError(f".env file not found at {env_path}")
+        # Variables already set in the environment take precedence
+        load_dotenv(env_path, override=False)
+    _env_loaded = True
+
+def setup_logging(level: str = "INFO", log_format: str = "json") -> QueueListener:
+    """
+    Configure the root logger for the whole application (first call only) and
+    start the listener that writes its records, unless it is already running.
+    
+    Handlers only enqueue records; a background thread does the (blocking)
+    stderr writes off the event loop. Call stop_logging() at shutdown to flush
+    pending records; a later call to setup_logging() starts a new listener.
+    
+    Args:
+        level: Root log level name
+        log_format: "json" for structured records, anything else for plain text
+            (with the `extra=` fields appended as key=value pairs)
+        
+    Returns:
+        QueueListener: The running listener
+    """
+    global _log_queue, _log_listener
+    if _log_queue is None:
+        _log_queue = queue.SimpleQueue()
+        handler = QueueHandler(_log_queue)
+        if log_format == "json":
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(TextFormatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+        logging.basicConfig(level=level.upper(), handlers=[handler], force=True)
+    if _log_listener is None:
+        _log_listener = QueueListener(_log_queue, logging.StreamHandler(), respect_handler_level=True)
+        _log_listener.start()
+    return _log_listener
+
+def stop_logging() -> None:
+    """
+    Stop the listener started by setup_logging(), writing out pending records.
+    
+    Records logged afterwards stay queued until setup_logging() starts a new one.
+    """
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
@@ -1,28 +1,15 @@
 """Configuration settings for the API."""
 from pydantic_settings import BaseSettings
+from functools import lru_cache
 import os
-from dotenv import load_dotenv
-from pathlib import Path
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-# Get the root directory of the project
-ROOT_DIR = Path(__file__).resolve().parent.parent.parent
-
-# Load environment variables from .env file
-env_path = ROOT_DIR / ".env"
-if not env_path.exists():
-    raise FileNotFoundError(f".env file not found at {env_path}")
+from app.core.bootstrap import env_path, load_environment
 
-load_dotenv(env_path)
-logger.info(f"Loaded .env file from: {env_path}")
+logger = logging.getLogger(__name__)
 
-# Debug: Print raw environment variable
-raw_db_path = os.environ.get("DB_PATH", "")
-logger.info(f"Raw DB_PATH from environment: '{raw_db_path}'")
+# Load environment variables from .env file (once per process)
+load_environment()
 
 class Settings(BaseSettings):
     """Application settings."""
@@ -53,18 +40,50 @@ class Settings(BaseSettings):
     # Format ISO YYYY-MM-DD
     TICK_REFERENCE_DATE: str = os.getenv("TICK_REFERENCE_DATE", "2024-01-01")
     
+    # How long a subject's tick granularity is reused before being read again (seconds)
+    GRANULARITE_CACHE_TTL: float = float(os.getenv("GRANULARITE_CACHE_TTL", "300"))
+    
     # Folders
     COURS_DIR: str = os.getenv("COURS_DIR", "cours")
     DB_PATH: str = os.environ["DB_PATH"]  # Strip any whitespace or special characters
     
+    # Log every SQL statement (debugging only: formats each query on the hot path)
+    SQL_ECHO: bool = os.getenv("SQL_ECHO", "0") == "1"
+    
+    # Database connection pool
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "20"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "1024"))
+    # Read-only connections (WAL readers run concurrently): one per core by default
+    DB_READ_POOL_SIZE: int = int(os.getenv("DB_READ_POOL_SIZE", str(os.cpu_count() or 4)))
+    
+    # SQLite page cache (KiB, per connection) and memory-mapped I/O size (bytes)
+    DB_CACHE_SIZE_KB: int = int(os.getenv("DB_CACHE_SIZE_KB", "65536"))
+    DB_MMAP_SIZE: int = int(os.getenv("DB_MMAP_SIZE", "268435456"))
+    
+    # Authentication: how long a resolved user is reused across requests (0 = disabled).
+    # The cache is per process: only enable it with a single worker, otherwise a user
+    # updated through one worker stays stale in the others for up to this many seconds
+    USER_CACHE_TTL: float = float(os.getenv("USER_CACHE_TTL", "0"))
+    
     # Port
     PORT: str = os.getenv("PORT", "8000")
+    
+    # Logging
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # "json" ou "text"
 
     class Config:
         """Pydantic config class."""
+        # .env is already loaded into os.environ by load_dotenv above: no env_file,
+        # so pydantic-settings does not parse the file a second time
         case_sensitive = True
-        env_file = str(env_path)
 
-# Create settings object
-settings = Settings()
-logger.info(f"Database path configured: '{settings.DB_PATH}'") 
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the application settings, built and validated once per process."""
+    return Settings()
+
+# Shared settings object (same instance as get_settings())
+settings = get_settings()
+logger.debug("Settings loaded (.env: %s, DB_PATH: %r)", env_path, settings.DB_PATH) 
\ No newline at end of file
@@ -10,6 +10,15 @@ class AuthenticationError(HTTPException):
             detail=detail,
         )
 
+class ForbiddenError(HTTPException):
+    """Exception raised when the user lacks the role required for a resource."""
+    
+    def __init__(self, detail: str = "You don't have permission to access this resource."):
+        super().__init__(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=detail,
+        )
+
 class NotFoundError(HTTPException):
     """Exception raised when a resource is not found."""
     
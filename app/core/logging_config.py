@@ -0,0 +1,44 @@
+"""Logging helpers (structured JSON or plain text output)."""
+import json
+import logging
+from datetime import datetime
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def _extra_fields(record: logging.LogRecord) -> dict:
+    """Fields passed to the logging call through `extra=`."""
+    return {key: value for key, value in record.__dict__.items() if key not in _RECORD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format each record as one JSON object, with `extra=` fields as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        payload.update(_extra_fields(record))
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Format records as plain text, with `extra=` fields appended as key=value pairs."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        extra = _extra_fields(record)
+        if not extra:
+            return text
+        fields = " ".join(f"{key}={value}" for key, value in extra.items())
+        # Après le message, avant une éventuelle trace d'exception
+        message_end = text.find("\n")
+        if message_end == -1:
+            return f"{text} {fields}"
+        return f"{text[:message_end]} {fields}{text[message_end:]}"
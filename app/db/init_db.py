@@ -1,45 +1,145 @@
 from sqlmodel import SQLModel, Session, text
+from sqlalchemy.schema import CreateIndex, CreateTable
 from app.db.session import engine
 import app.db.models  # Assure l'import des modèles
+import hashlib
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def schema_version() -> int:
+    """Hash of the models' DDL, as a positive 31-bit int usable as PRAGMA user_version."""
+    dialect = engine.dialect
+    ddl = []
+    for table in SQLModel.metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(dialect=dialect)))
+        ddl.extend(
+            str(CreateIndex(index).compile(dialect=dialect))
+            for index in sorted(table.indexes, key=lambda index: index.name)
+        )
+    digest = hashlib.sha256("\n".join(ddl).encode()).digest()
+    # 0 est la valeur par défaut de user_version (base jamais initialisée)
+    return (int.from_bytes(digest[:4], "big") & 0x7FFFFFFF) or 1
+
 def init_db():
-    """Initialize database tables."""
+    """Initialize database tables.
+    
+    Skipped entirely when the database was already initialized with the current
+    models: their schema hash is stored in PRAGMA user_version once every step
+    succeeded.
+    """
+    expected_version = schema_version()
+    with engine.connect() as conn:
+        current_version = conn.execute(text("PRAGMA user_version")).scalar()
+    if current_version == expected_version:
+        logger.info("Database schema up to date, skipping initialization")
+        return
+    
     logger.info("Creating database tables...")
     SQLModel.metadata.create_all(engine)
+    migrated = migrate_database()
+    indexed = ensure_indexes()
+    if migrated and indexed:
+        with engine.begin() as conn:
+            # PRAGMA n'accepte pas de paramètre lié ; valeur entière calculée localement
+            conn.execute(text(f"PRAGMA user_version = {expected_version}"))
     logger.info("Database tables created successfully")
 
+def ensure_indexes():
+    """Create indexes declared on the models that are missing from existing tables.
+    
+    create_all() only creates indexes together with new tables, so databases created
+    before an index was declared would never get it.
+    
+    Returns:
+        bool: True if every index exists afterwards
+    """
+    ok = True
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(engine, checkfirst=True)
+            except Exception as e:
+                # e.g. existing duplicate rows preventing a unique index
+                logger.error(f"Could not create index {index.name}: {e}")
+                ok = False
+    return ok
+
 def migrate_database():
-    """Handle database migrations for missing columns."""
+    """Handle database migrations for missing columns.
+    
+    Returns:
+        bool: True if every migration step succeeded
+    """
+    ok = True
     with Session(engine) as session:
         try:
             # Check if 'ref' column exists in challenge table
-            result = session.exec(text("PRAGMA table_info(challenge)")).fetchall()
-            columns = [column[1] for column in result]
+            has_ref = session.exec(
+                text("SELECT 1 FROM pragma_table_info('challenge') WHERE name = 'ref'")
+            ).first() is not None
             
-            if 'ref' not in columns:
+            if not has_ref:
                 logger.info("Adding missing 'ref' column to challenge table...")
                 
                 # Add the ref column
                 session.exec(text("ALTER TABLE challenge ADD COLUMN ref TEXT"))
                 
-                # Update existing challenges with generated refs
-                existing_challenges = session.exec(text("SELECT id, matiere FROM challenge")).fetchall()
-                for challenge_id, matiere in existing_challenges:
-                    ref = f"{matiere}-{challenge_id:03d}"
-                    session.exec(text("UPDATE challenge SET ref = :ref WHERE id = :id"), 
-                               {"ref": ref, "id": challenge_id})
+                # Update existing challenges with generated refs (e.g. "SYD-007") in one statement
+                session.exec(text("UPDATE challenge SET ref = printf('%s-%03d', matiere, id) WHERE ref IS NULL"))
                 
                 session.commit()
                 logger.info("Successfully added 'ref' column and updated existing challenges.")
+            
+            # Challenges are listed and served by their stored ref: fill the missing ones and
+            # align any stale value on the generated format
+            session.exec(text(
+                "UPDATE challenge SET ref = printf('%s-%03d', matiere, id) "
+                "WHERE ref IS NULL OR ref <> printf('%s-%03d', matiere, id)"
+            ))
+            session.commit()
                 
         except Exception as e:
             logger.error(f"Migration error: {e}")
             session.rollback()
+            ok = False
+
+        try:
+            migrate_subscriptions(session)
+        except Exception as e:
+            logger.error(f"Subscriptions migration error: {e}")
+            session.rollback()
+            ok = False
+    return ok
+
+def migrate_subscriptions(session: Session):
+    """Move the legacy comma-separated user.subscriptions column to the usersubscription table."""
+    has_legacy_column = session.exec(
+        text("SELECT 1 FROM pragma_table_info('user') WHERE name = 'subscriptions'")
+    ).first() is not None
+    if not has_legacy_column:
+        return
+
+    rows = session.exec(text(
+        "SELECT id, subscriptions FROM user "
+        "WHERE subscriptions IS NOT NULL AND subscriptions != ''"
+    )).fetchall()
+    if not rows:
+        return
+
+    logger.info(f"Migrating subscriptions of {len(rows)} users to the usersubscription table...")
+    for user_id, subscriptions in rows:
+        matieres = dict.fromkeys(m.strip() for m in subscriptions.split(',') if m.strip())
+        for matiere in matieres:
+            session.exec(
+                text("INSERT OR IGNORE INTO usersubscription (user_id, matiere) VALUES (:user_id, :matiere)")
+                .bindparams(user_id=user_id, matiere=matiere)
+            )
+
+    # Vider l'ancienne colonne pour ne pas réimporter des abonnements supprimés depuis
+    session.exec(text("UPDATE user SET subscriptions = NULL"))
+    session.commit()
+    logger.info("Successfully migrated user subscriptions.")
 
 def reset_database():
     """Drop all tables and recreate them (useful for development)."""
@@ -49,6 +149,7 @@ def reset_database():
 
 if __name__ == "__main__":
     import sys
+    logging.basicConfig(level=logging.INFO)
     if len(sys.argv) > 1 and sys.argv[1] == "--reset":
         reset_database()
     else:
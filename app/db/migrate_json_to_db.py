@@ -3,19 +3,34 @@
 Script de migration pour transférer les données de conversations.json vers la base de données.
 """
 
-import json
 import os
 import sys
 import shutil
 from datetime import datetime
-from typing import Dict, Any
-from sqlmodel import SQLModel, create_engine, Session, select
+from typing import Dict, Any, List, Optional, Set, Tuple
+import orjson
+from sqlmodel import SQLModel, create_engine, Session, select, text
+from sqlalchemy import insert
 
 # Ajouter le répertoire parent au chemin pour les imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from app.db.models import StudentResponse, Evaluation, User, Challenge
 from app.db.session import engine
+from app.db.init_db import ensure_indexes
+
+# Nombre de conversations insérées par lot et par transaction (un commit = un fsync du WAL)
+BATCH_SIZE = 500
+
+# Insère l'utilisateur ou, si l'email existe déjà, retourne l'id existant
+_UPSERT_USER = text(
+    "INSERT INTO user (username, email, role) VALUES (:username, :email, 'student') "
+    "ON CONFLICT(email) DO UPDATE SET email = excluded.email RETURNING id"
+)
+
+def _dumps(value: Any) -> str:
+    """Sérialise en JSON pour une colonne TEXT (orjson, plus rapide que json.dumps)."""
+    return orjson.dumps(value).decode()
 
 def backup_current_db():
     """Sauvegarde la base de données actuelle."""
@@ -34,8 +49,8 @@ def load_json_conversations():
         return {}
     
     try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(json_path, 'rb') as f:
+            return orjson.loads(f.read())
     except Exception as e:
         print(f"❌ Erreur lors du chargement du JSON : {e}")
         return {}
@@ -48,34 +63,80 @@ def find_or_create_user(session: Session, email: str, user_id: int = None) -> in
         if user:
             return user.id
     
-    # Chercher par email
-    stmt = select(User).where(User.email == email)
-    user = session.exec(stmt).first()
-    if user:
-        return user.id
-    
-    # Créer un nouvel utilisateur
-    new_user = User(
-        username=email.split('@')[0],
-        email=email,
-        role="student"
-    )
-    session.add(new_user)
-    session.commit()
-    session.refresh(new_user)
-    return new_user.id
+    # Trouver ou créer par email en une seule instruction (index unique sur user.email)
+    return session.exec(
+        _UPSERT_USER.bindparams(username=email.split('@')[0], email=email)
+    ).scalar_one()
 
-def find_challenge_by_api_id(session: Session, api_challenge_id: int) -> int:
+def find_challenge_by_api_id(challenge_ids: Set[int], api_challenge_id: int) -> Optional[int]:
     """Trouve un challenge par son api_challenge_id (mapping depuis l'ancien système)."""
     if not api_challenge_id:
         return None
     
     # Pour le moment, on utilise l'ID directement
     # Dans un vrai système, il faudrait un mapping plus sophistiqué
-    challenge = session.get(Challenge, api_challenge_id)
-    if challenge:
-        return challenge.id
-    return None
+    return api_challenge_id if api_challenge_id in challenge_ids else None
+
+def build_evaluation_values(data: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """Construit les colonnes de l'évaluation d'une conversation (ancien et nouveau format JSON).
+    
+    student_response_id est ajouté une fois la réponse insérée.
+    """
+    eval_data = data['evaluation']
+    
+    # Gérer les deux formats d'évaluation
+    if 'raw_api_response' in eval_data:
+        # Nouveau format avec raw_api_response
+        api_data = eval_data['raw_api_response'].get('data', {})
+        score = api_data.get('score', eval_data.get('score'))
+        feedback = api_data.get('feedback', eval_data.get('feedback'))
+        points_forts = _dumps(api_data.get('points_forts', []))
+        points_ameliorer = _dumps(api_data.get('points_ameliorer', []))
+        evaluated_at = api_data.get('evaluated_at')
+        raw_response = _dumps(eval_data['raw_api_response'])
+    else:
+        # Ancien format simple
+        score = eval_data.get('score')
+        feedback = _dumps(eval_data.get('feedback', []))
+        points_forts = None
+        points_ameliorer = None
+        evaluated_at = None
+        raw_response = _dumps(eval_data)
+    
+    return {
+        "score": score,
+        "grade": eval_data.get('grade'),
+        "feedback": feedback,
+        "points_forts": points_forts,
+        "points_ameliorer": points_ameliorer,
+        "feedback_sent": data.get('feedback_sent', False),
+        "feedback_sent_at": now if data.get('feedback_sent') else None,
+        "evaluated_at": evaluated_at,
+        "raw_api_response": raw_response,
+        "created_at": now
+    }
+
+def insert_batch(session: Session, batch: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]) -> None:
+    """
+    Insère un lot de réponses puis leurs évaluations, en deux executemany.
+    
+    Args:
+        session: Session de base de données
+        batch: Couples (colonnes de la réponse, colonnes de l'évaluation ou None)
+    """
+    # RETURNING dans l'ordre des paramètres : l'id de chaque réponse insérée
+    response_ids = session.exec(
+        insert(StudentResponse).returning(StudentResponse.id, sort_by_parameter_order=True),
+        params=[response_values for response_values, _ in batch]
+    ).scalars().all()
+    
+    evaluations = [
+        {**evaluation_values, "student_response_id": response_id}
+        for response_id, (_, evaluation_values) in zip(response_ids, batch)
+        if evaluation_values is not None
+    ]
+    if evaluations:
+        session.exec(insert(Evaluation), params=evaluations)
 
 def migrate_conversations_to_db():
     """Migre les conversations du JSON vers la base de données."""
@@ -91,6 +152,8 @@ def migrate_conversations_to_db():
     
     # Créer les tables si elles n'existent pas
     SQLModel.metadata.create_all(engine)
+    # L'UPSERT des utilisateurs s'appuie sur l'index unique de user.email
+    ensure_indexes()
     print("✅ Tables créées ou vérifiées")
     
     migrated_count = 0
@@ -98,92 +161,90 @@ def migrate_conversations_to_db():
     error_count = 0
     
     with Session(engine) as session:
+        # Réponses déjà migrées : une seule requête au lieu d'un SELECT par conversation
+        existing_ids = set(session.exec(select(StudentResponse.question_id)).all())
+        # Identifiants des challenges chargés une fois (au lieu d'un session.get par ligne)
+        challenge_ids = set(session.exec(select(Challenge.id)).all())
+        batch = []
+        # Horodatage commun à toutes les lignes d'un lot
+        now = datetime.now()
+        
+        def flush_batch():
+            nonlocal migrated_count, error_count
+            try:
+                # SAVEPOINT autour du lot : en cas d'échec, seules ses lignes sont annulées
+                # (pas les utilisateurs créés) et elles sont reprises une par une, pour
+                # n'écarter que les conversations fautives
+                try:
+                    with session.begin_nested():
+                        insert_batch(session, batch)
+                    inserted = len(batch)
+                except Exception as e:
+                    print(f"⚠️  Lot de {len(batch)} conversations refusé ({e}), insertion une par une")
+                    inserted = 0
+                    for item in batch:
+                        try:
+                            with session.begin_nested():
+                                insert_batch(session, [item])
+                            inserted += 1
+                        except Exception as e:
+                            print(f"❌ Erreur lors de la migration de {item[0]['question_id']}: {e}")
+                            error_count += 1
+                session.commit()
+                migrated_count += inserted
+                print(f"📈 {migrated_count} conversations migrées...")
+            except Exception as e:
+                print(f"❌ Erreur lors de l'insertion d'un lot de {len(batch)} conversations: {e}")
+                error_count += len(batch)
+                session.rollback()
+            batch.clear()
+        
         for question_id, data in conversations.items():
+            if question_id in existing_ids:
+                print(f"⏭️  Question {question_id} déjà migrée, passage")
+                skipped_count += 1
+                continue
+            
+            # Obtenir l'email de l'étudiant
+            student_email = data.get('student', '')
+            if not student_email:
+                print(f"❌ Pas d'email étudiant pour {question_id}")
+                error_count += 1
+                continue
+            
             try:
-                # Vérifier si cette réponse existe déjà
-                stmt = select(StudentResponse).where(StudentResponse.question_id == question_id)
-                existing = session.exec(stmt).first()
-                if existing:
-                    print(f"⏭️  Question {question_id} déjà migrée, passage")
-                    skipped_count += 1
-                    continue
-                
-                # Obtenir l'email de l'étudiant
-                student_email = data.get('student', '')
-                if not student_email:
-                    print(f"❌ Pas d'email étudiant pour {question_id}")
-                    error_count += 1
-                    continue
-                
                 # Trouver ou créer l'utilisateur
                 user_id = find_or_create_user(session, student_email, data.get('user_id'))
                 
                 # Trouver le challenge
-                challenge_id = find_challenge_by_api_id(session, data.get('api_challenge_id'))
+                challenge_id = find_challenge_by_api_id(challenge_ids, data.get('api_challenge_id'))
                 
-                # Créer la réponse de l'étudiant
-                student_response = StudentResponse(
-                    question_id=question_id,
-                    user_id=user_id,
-                    challenge_id=challenge_id,
-                    response=data.get('response'),
-                    response_date=data.get('response_date'),
-                    created_at=datetime.now(),
-                    updated_at=datetime.now()
-                )
-                
-                session.add(student_response)
-                session.commit()
-                session.refresh(student_response)
-                
-                # Migrer l'évaluation si elle existe
+                # Colonnes de la réponse de l'étudiant et de son évaluation éventuelle
+                response_values = {
+                    "question_id": question_id,
+                    "user_id": user_id,
+                    "challenge_id": challenge_id,
+                    "response": data.get('response'),
+                    "response_date": data.get('response_date'),
+                    "created_at": now,
+                    "updated_at": now
+                }
+                evaluation_values = None
                 if data.get('evaluated') and 'evaluation' in data:
-                    eval_data = data['evaluation']
-                    
-                    # Gérer les deux formats d'évaluation
-                    if 'raw_api_response' in eval_data:
-                        # Nouveau format avec raw_api_response
-                        api_data = eval_data['raw_api_response'].get('data', {})
-                        score = api_data.get('score', eval_data.get('score'))
-                        feedback = api_data.get('feedback', eval_data.get('feedback'))
-                        points_forts = json.dumps(api_data.get('points_forts', []))
-                        points_ameliorer = json.dumps(api_data.get('points_ameliorer', []))
-                        evaluated_at = api_data.get('evaluated_at')
-                        raw_response = json.dumps(eval_data['raw_api_response'])
-                    else:
-                        # Ancien format simple
-                        score = eval_data.get('score')
-                        feedback = json.dumps(eval_data.get('feedback', []))
-                        points_forts = None
-                        points_ameliorer = None
-                        evaluated_at = None
-                        raw_response = json.dumps(eval_data)
-                    
-                    evaluation = Evaluation(
-                        student_response_id=student_response.id,
-                        score=score,
-                        grade=eval_data.get('grade'),
-                        feedback=feedback,
-                        points_forts=points_forts,
-                        points_ameliorer=points_ameliorer,
-                        feedback_sent=data.get('feedback_sent', False),
-                        feedback_sent_at=datetime.now() if data.get('feedback_sent') else None,
-                        evaluated_at=evaluated_at,
-                        raw_api_response=raw_response,
-                        created_at=datetime.now()
-                    )
-                    
-                    session.add(evaluation)
-                    session.commit()
-                
-                migrated_count += 1
-                if migrated_count % 10 == 0:
-                    print(f"📈 {migrated_count} conversations migrées...")
-                    
+                    evaluation_values = build_evaluation_values(data, now)
+            
             except Exception as e:
                 print(f"❌ Erreur lors de la migration de {question_id}: {e}")
                 error_count += 1
-                session.rollback()
+                continue
+            
+            batch.append((response_values, evaluation_values))
+            if len(batch) >= BATCH_SIZE:
+                flush_batch()
+                now = datetime.now()
+        
+        if batch:
+            flush_batch()
     
     print(f"\n✅ Migration terminée:")
     print(f"   - {migrated_count} conversations migrées")
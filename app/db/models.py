@@ -1,13 +1,26 @@
-from sqlmodel import SQLModel, Field
-from typing import Optional
+from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import DateTime, Index, UniqueConstraint
+from typing import List, Optional
 from datetime import datetime
 
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    username: str
-    email: str
+    username: str = Field(index=True)
+    email: str = Field(unique=True, index=True)
     role: str
-    subscriptions: Optional[str] = Field(default="", description="Liste des matières auxquelles l'utilisateur est abonné, séparées par des virgules")
+    subscriptions: List["UserSubscription"] = Relationship(
+        back_populates="user",
+        sa_relationship_kwargs={"order_by": "UserSubscription.id", "cascade": "all, delete-orphan"}
+    )
+
+class UserSubscription(SQLModel, table=True):
+    """Abonnement d'un utilisateur à une matière (une ligne par couple utilisateur/matière)."""
+    __table_args__ = (UniqueConstraint("user_id", "matiere"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)  # conserve l'ordre d'abonnement
+    user_id: int = Field(foreign_key="user.id")
+    matiere: str = Field(index=True)
+    user: Optional[User] = Relationship(back_populates="subscriptions")
 
 class Matiere(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -15,28 +28,40 @@ class Matiere(SQLModel, table=True):
     description: Optional[str] = None
     granularite: str = Field(default="semaine", description="jour|semaine|mois|2jours...")
 
+# Les horodatages sont des datetime locaux sans fuseau (datetime.now()) : colonnes DateTime
+# explicites (sa_type), les versions récentes de SQLModel exigeant sinon un fuseau horaire
 class Document(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    file_hash: str = Field(unique=True, description="MD5 hash of the file content")
+    file_hash: str = Field(unique=True, description="BLAKE3 hash of the file content (MD5 for records not yet rehashed)")
     filename: str
     matiere: str
     file_path: str = Field(description="Relative path from cours directory")
     document_type: str = Field(description="File extension without dot (md, pdf, etc.)")
     is_exam: bool = Field(default=False, description="Whether this document is an exam")
     file_size: int = Field(description="File size in bytes")
-    upload_date: datetime = Field(default_factory=datetime.now, description="When the document was first added")
-    last_modified: datetime = Field(default_factory=datetime.now, description="Last modification time of the file")
-    last_indexed: Optional[datetime] = Field(default=None, description="When this document was last indexed in the vector database")
+    upload_date: datetime = Field(default_factory=datetime.now, sa_type=DateTime, description="When the document was first added")
+    last_modified: datetime = Field(default_factory=datetime.now, sa_type=DateTime, description="Last modification time of the file")
+    last_indexed: Optional[datetime] = Field(default=None, sa_type=DateTime, description="When this document was last indexed in the vector database")
     is_indexed: bool = Field(default=False, description="Whether this document is currently in the vector index")
 
 class Challenge(SQLModel, table=True):
+    # Challenges d'une matière dans l'ordre de service (date, id), sans tri
+    __table_args__ = (Index("ix_challenge_matiere_date_id", "matiere", "date", "id"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    ref: Optional[str] = Field(default=None)  # ex: "SYD-001"
+    ref: Optional[str] = Field(default=None, index=True, unique=True)  # ex: "SYD-001", généré depuis matiere et id
     question: str
     matiere: str
     date: str
 
 class ChallengeServed(SQLModel, table=True):
+    # Couvre les recherches par (matiere, granularite) et par (matiere, granularite, tick),
+    # et le NOT EXISTS du prochain challenge non servi (matiere, granularite, challenge_ref)
+    __table_args__ = (
+        Index("ix_challengeserved_matiere_granularite_tick", "matiere", "granularite", "tick"),
+        Index("ix_challengeserved_matiere_granularite_ref", "matiere", "granularite", "challenge_ref"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     matiere: str
     granularite: str
@@ -64,8 +89,8 @@ class StudentResponse(SQLModel, table=True):
     response: Optional[str] = Field(default=None, description="Réponse de l'étudiant")
     response_date: Optional[str] = Field(default=None, description="Date de réponse de l'étudiant")
     sent_message_id: Optional[str] = Field(default=None, description="Message ID de l'email original")
-    created_at: datetime = Field(default_factory=datetime.now, description="Date de création de l'enregistrement")
-    updated_at: datetime = Field(default_factory=datetime.now, description="Date de dernière mise à jour")
+    created_at: datetime = Field(default_factory=datetime.now, sa_type=DateTime, description="Date de création de l'enregistrement")
+    updated_at: datetime = Field(default_factory=datetime.now, sa_type=DateTime, description="Date de dernière mise à jour")
 
 class Evaluation(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -82,10 +107,10 @@ class Evaluation(SQLModel, table=True):
     
     # Feedback envoyé
     feedback_sent: Optional[bool] = Field(default=False, description="Si le feedback a été envoyé à l'étudiant")
-    feedback_sent_at: Optional[datetime] = Field(default=None, description="Date d'envoi du feedback")
+    feedback_sent_at: Optional[datetime] = Field(default=None, sa_type=DateTime, description="Date d'envoi du feedback")
     
     # Métadonnées de l'évaluation  
     evaluated_at: Optional[str] = Field(default=None, description="Date d'évaluation par l'API")
     raw_api_response: Optional[str] = Field(default=None, description="Réponse brute de l'API en JSON pour backup complet")
     
-    created_at: datetime = Field(default_factory=datetime.now, description="Date de création de l'évaluation") 
\ No newline at end of file
+    created_at: datetime = Field(default_factory=datetime.now, sa_type=DateTime, description="Date de création de l'évaluation") 
\ No newline at end of file
@@ -32,6 +32,7 @@ def clear_all_data():
         session.execute(text("DELETE FROM challengeserved"))
         session.execute(text("DELETE FROM challenge"))
         session.execute(text("DELETE FROM matiere"))
+        session.execute(text("DELETE FROM usersubscription"))
         session.execute(text("DELETE FROM user"))
         session.execute(text("DELETE FROM token"))
         session.commit()
@@ -70,7 +71,10 @@ def show_database_contents():
         
         if users_count > 0:
             # Show users
-            users = session.exec(text("SELECT username, role, subscriptions FROM user")).fetchall()
+            users = session.exec(text(
+                "SELECT u.username, u.role, group_concat(s.matiere, ',') FROM user u "
+                "LEFT JOIN usersubscription s ON s.user_id = u.id GROUP BY u.id"
+            )).fetchall()
             print("\n👥 USERS:")
             for user in users:
                 print(f"   {user[0]} ({user[1]}) - subscribed to: {user[2]}")
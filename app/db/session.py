@@ -1,58 +1,175 @@
-from sqlmodel import create_engine, Session, text
+from sqlmodel import create_engine, Session
+from sqlalchemy import event
+from sqlalchemy.engine import URL
+from sqlalchemy.pool import QueuePool
 from app.core.config import settings
 import logging
-import os
+from pathlib import Path
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Get database path from settings
 db_path = settings.DB_PATH
-logger.info(f"Initializing database at: {db_path}")
-logger.info(f"Database absolute path: {os.path.abspath(db_path)}")
-logger.info(f"Database exists: {os.path.exists(db_path)}")
-logger.info(f"Database directory exists: {os.path.exists(os.path.dirname(db_path))}")
-
-# Ensure database directory exists
-db_dir = os.path.dirname(db_path)
-if not os.path.exists(db_dir):
-    os.makedirs(db_dir)
-    logger.info(f"Created database directory: {db_dir}")
 
 # Create database URL
 DATABASE_URL = f"sqlite:///{db_path}"
-logger.info(f"Database URL: {DATABASE_URL}")
-
-# Create engine with optimized settings for concurrent access
-engine = create_engine(
-    DATABASE_URL,
-    echo=True,
-    poolclass=None,
-    connect_args={
-        "check_same_thread": False,  # Allow multiple threads to access the database
-        "timeout": 60,  # Increase timeout for busy database
-        "isolation_level": "IMMEDIATE",  # Use immediate transaction isolation
-    }
-)
-
-# Configure SQLite pragmas after engine creation
-def configure_sqlite():
-    with engine.connect() as conn:
-        logger.info("Configuring SQLite pragmas...")
-        conn.execute(text("PRAGMA journal_mode=WAL"))
-        conn.execute(text("PRAGMA synchronous=NORMAL"))
-        conn.execute(text("PRAGMA busy_timeout=60000"))
-        conn.execute(text("PRAGMA cache_size=-2000"))
-        conn.execute(text("PRAGMA foreign_keys=ON"))
-        conn.execute(text("PRAGMA temp_store=MEMORY"))
-        conn.execute(text("PRAGMA locking_mode=NORMAL"))  # Ensure proper locking
-        conn.commit()
-        logger.info("SQLite pragmas configured successfully")
-
-# Configure SQLite settings
-configure_sqlite()
+logger.debug("Database URL: %s", DATABASE_URL)
+
+# Keep SQL statement logging off unless explicitly enabled: with the root logger at
+# INFO, sqlalchemy.engine would otherwise still log every query even without echo
+logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO if settings.SQL_ECHO else logging.WARNING)
+
+# Negative cache_size is in KiB (64 MiB by default); mmap bypasses read() for hot pages
+_CACHE_SIZE_PRAGMA = f"PRAGMA cache_size=-{settings.DB_CACHE_SIZE_KB}"
+_MMAP_SIZE_PRAGMA = f"PRAGMA mmap_size={settings.DB_MMAP_SIZE}"
+
+# Configure SQLite pragmas on every new pooled connection: apart from journal_mode,
+# they are per-connection settings and would otherwise only apply to the first one
+def configure_sqlite(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=60000")
+    cursor.execute(_CACHE_SIZE_PRAGMA)
+    cursor.execute(_MMAP_SIZE_PRAGMA)
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA locking_mode=NORMAL")  # Ensure proper locking
+    cursor.close()
+
+# Read-only connections keep the per-connection tuning but never touch the journal mode
+# (the writer switches the file to WAL, which lets readers run alongside it)
+def configure_sqlite_readonly(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA busy_timeout=60000")
+    cursor.execute(_CACHE_SIZE_PRAGMA)
+    cursor.execute(_MMAP_SIZE_PRAGMA)
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+# Create the database directory on the first connection rather than at import:
+# importing the module (workers, test collection) then touches no filesystem
+def ensure_database_dir(dialect, connection_record, cargs, cparams):
+    # cargs[0] is the database file path handed to sqlite3.connect()
+    Path(cargs[0]).parent.mkdir(parents=True, exist_ok=True)
+
+# Let SQLAlchemy, not the sqlite3 driver, open transactions: the driver would only
+# emit BEGIN right before the first INSERT/UPDATE/DELETE, after the session's reads
+def disable_driver_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+# Sessions that write (get_write_session) take the write lock when their transaction
+# starts, so a read-then-write session never has to upgrade its lock (SQLITE_BUSY without
+# waiting) when another writer is active. The others start a deferred transaction and
+# only lock the database once they actually write
+def begin_transaction(conn):
+    if conn.get_execution_options().get("begin_immediate"):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+    else:
+        conn.exec_driver_sql("BEGIN")
+
+def build_engine(database_url: str, timeout: int = 60):
+    """
+    Create a pooled SQLite engine with the application's connection settings.
+    
+    Connections are reused across requests (and threadpool workers) instead of
+    being reopened, each keeps its compiled statements cached, and the PRAGMA
+    listener is attached once so every pooled connection gets it. This is the
+    write engine; see write_engine() for transactions that start with BEGIN IMMEDIATE.
+    """
+    new_engine = create_engine(
+        database_url,
+        echo=settings.SQL_ECHO,
+        poolclass=QueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        connect_args={
+            "check_same_thread": False,  # Allow multiple threads to access the database
+            "timeout": timeout,  # Increase timeout for busy database
+            "cached_statements": settings.DB_STATEMENT_CACHE_SIZE,  # sqlite3 prepared-statement cache per connection
+        }
+    )
+    event.listen(new_engine, "do_connect", ensure_database_dir, once=True)
+    event.listen(new_engine, "connect", configure_sqlite)
+    event.listen(new_engine, "connect", disable_driver_transactions)
+    event.listen(new_engine, "begin", begin_transaction)
+    return new_engine
+
+def build_read_engine(path: str, timeout: int = 60):
+    """
+    Create a pooled read-only SQLite engine on the database file at `path`.
+    
+    The file is opened with `mode=ro`, so a read session can never take the write
+    lock; with WAL, its connections read concurrently with the writer engine.
+    """
+    # Percent-encoded file: URI, so "#", "?" or "%" in the path are not read as a fragment
+    # or parameters; URL.create passes it to sqlite3 as is (a URL string would be unquoted)
+    url = URL.create(
+        "sqlite",
+        database=Path(path).resolve().as_uri(),
+        query={"mode": "ro", "uri": "true"},
+    )
+    new_engine = create_engine(
+        url,
+        echo=settings.SQL_ECHO,
+        poolclass=QueuePool,
+        pool_size=settings.DB_READ_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": timeout,
+            "cached_statements": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    )
+    event.listen(new_engine, "connect", configure_sqlite_readonly)
+    return new_engine
+
+# Create engine with optimized settings for concurrent access (all writes go through it)
+engine = build_engine(DATABASE_URL)
+# Read-only engine for endpoints that only query the database
+read_engine = build_read_engine(db_path)
+
+def warm_pool(target_engine, size: int) -> None:
+    """Open `size` pooled connections at once, then return them to the pool."""
+    connections = [target_engine.connect() for _ in range(size)]
+    for connection in connections:
+        connection.close()
+
+def write_engine():
+    """
+    The write engine (same pool) with transactions that start with BEGIN IMMEDIATE.
+    
+    A session bound to it takes the database write lock on its first statement and
+    keeps it until commit, rollback or close: any other session writing meanwhile
+    waits for it (busy_timeout). Only use it for sessions that write.
+    """
+    return engine.execution_options(begin_immediate=True)
 
 def get_session():
+    """Yield a database session for one request (deferred transactions)."""
     with Session(engine) as session:
-        yield session 
\ No newline at end of file
+        yield session
+
+def get_write_session():
+    """
+    Yield a database session for one request that reads, then writes.
+    
+    Its first statement takes the database write lock (BEGIN IMMEDIATE): don't
+    open another session on the write engine while it is in use. Endpoints that
+    only read use get_read_session.
+    """
+    with Session(write_engine()) as session:
+        yield session
+
+def get_read_session():
+    """
+    Yield a read-only database session for one request.
+    
+    Any write through it fails ("attempt to write a readonly database"): use it
+    only for endpoints that never add, update or delete rows.
+    """
+    with Session(read_engine) as session:
+        yield session
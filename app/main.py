@@ -1,15 +1,23 @@
 """Main entry point for the Le Rhino API application."""
 import os
+import logging
+from contextlib import asynccontextmanager
+import orjson
 import uvicorn
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.exceptions import RequestValidationError
 
 from app.core.config import settings
 from app.core.exceptions import AuthenticationError, NotFoundError, ValidationError, ServerError
-from app.models.base import ApiResponse
+from app.core.bootstrap import setup_logging, stop_logging
+from app.models.base import ApiResponse, now_iso
+
+# Configure logging once for the whole application
+setup_logging(settings.LOG_LEVEL, settings.LOG_FORMAT)
+logger = logging.getLogger(__name__)
 
 # Import routes
 from app.api.routes import auth, matieres, documents, questions, evaluations, challenges, leaderboard
@@ -17,8 +25,48 @@ from app.api.routes import auth, matieres, documents, questions, evaluations, ch
 # Create static directory if it doesn't exist
 os.makedirs("static", exist_ok=True)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize resources at startup and release them at shutdown."""
+    from app.db.session import engine, read_engine, warm_pool
+    # Restart the log listener if a previous shutdown stopped it (no-op otherwise)
+    setup_logging(settings.LOG_LEVEL, settings.LOG_FORMAT)
+    try:
+        # Initialize database tables
+        from app.db.init_db import init_db
+        init_db()
+        print("✅ Database initialized successfully!")
+        
+        # Open the pooled connections (and run their PRAGMAs) before the first requests
+        warm_pool(engine, settings.DB_POOL_SIZE)
+        warm_pool(read_engine, settings.DB_READ_POOL_SIZE)
+        
+        # Initialize Pinecone and other resources will be implemented here
+        print("Initializing API resources...")
+    except Exception as e:
+        print(f"Error during startup: {e}")
+    
+    yield
+    
+    # Fold the WAL back into the database file so the next start maps a compact file
+    try:
+        # Raw DBAPI connection: a checkpoint cannot run inside the transaction
+        # SQLAlchemy would open
+        conn = engine.raw_connection()
+        try:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.warning("WAL checkpoint failed at shutdown: %s", e)
+    read_engine.dispose()
+    engine.dispose()
+    # Flush pending log records before exiting
+    stop_logging()
+
 # Create FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.API_TITLE,
     description=settings.API_DESCRIPTION,
     version=settings.API_VERSION,
@@ -31,8 +79,10 @@ app = FastAPI(
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # For production, set specific origins
-    allow_credentials=True,
-    allow_methods=["*"],
+    # Authentication goes through the user_id query parameter, not cookies: without
+    # credentials a wildcard origin is answered with a constant "*" (no per-request echo)
+    allow_credentials=False,
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
 )
 
@@ -70,48 +120,47 @@ async def general_exception_handler(request: Request, exc: Exception):
         content={"success": False, "message": f"Server error: {str(exc)}", "data": None},
     )
 
-# Root endpoint
-@app.get("/", tags=["Frontend"])
-async def serve_homepage():
-    """Serve the homepage."""
-    return FileResponse("static/index.html")
+# Root API endpoint: the body is serialized once, only the timestamp is appended per request
+_API_STATUS_PREFIX = orjson.dumps({
+    "success": True,
+    "message": "Le Rhino API",
+    "data": {"status": "online"}
+})[:-1] + b',"timestamp":"'
 
-# Root API endpoint
-@app.get("/api", response_model=ApiResponse, tags=["Status"])
+@app.get("/api", responses={200: {"model": ApiResponse}}, tags=["Status"])
 async def root():
     """Root endpoint to check API status."""
-    return {
-        "success": True,
-        "message": "Le Rhino API", 
-        "data": {"status": "online"}
-    }
-
-# Include routers
-app.include_router(auth.router, prefix="/api")
-app.include_router(matieres.router, prefix="/api")
-app.include_router(documents.router, prefix="/api")  # No prefix as it already has matiere-specific paths
-app.include_router(questions.router, prefix="/api")
-app.include_router(evaluations.router, prefix="/api")
-app.include_router(challenges.router, prefix="/api")
-app.include_router(leaderboard.router, prefix="/api")
-
-# Startup event
-@app.on_event("startup")
-async def startup_event():
-    """Initialize resources at startup."""
-    try:
-        # Initialize database tables
-        from app.db.init_db import init_db
-        init_db()
-        print("✅ Database initialized successfully!")
-        
-        # Initialize Pinecone and other resources will be implemented here
-        print("Initializing API resources...")
-    except Exception as e:
-        print(f"Error during startup: {e}")
+    return Response(
+        content=_API_STATUS_PREFIX + now_iso().encode() + b'"}',
+        media_type="application/json",
+    )
+
+# Include routers (each router declares its full /api prefix)
+app.include_router(auth.router)
+app.include_router(matieres.router)
+app.include_router(documents.router)
+app.include_router(questions.router)
+app.include_router(evaluations.router)
+app.include_router(challenges.router)
+app.include_router(leaderboard.router)
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles whose responses browsers may cache (assets under /static)."""
+    
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=3600, immutable"
+        return response
 
 # Mount static files directory
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
+
+# Homepage: an explicit route rather than a catch-all mount on "/", which would answer
+# every unmatched path (no trailing-slash redirects, 405 instead of 404)
+@app.get("/", tags=["Frontend"])
+async def serve_homepage():
+    """Serve the homepage."""
+    return FileResponse("static/index.html")
 
 # For direct execution
 if __name__ == "__main__":
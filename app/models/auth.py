@@ -1,9 +1,12 @@
 """Authentication models."""
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+from typing import Optional, List, Tuple, FrozenSet
 
 class UserInDB(BaseModel):
     """Model representing a user stored in the database."""
+    # Immutable: one instance is resolved per request and shared by every dependant
+    model_config = ConfigDict(frozen=True)
+    
     id: str
     username: str
     email: Optional[str] = None
@@ -11,4 +14,32 @@ class UserInDB(BaseModel):
     disabled: bool = False
     role: str = "student"  # "student", "teacher", "admin"
     auth_token: str = Field(default="simple_auth", description="Authentication method identifier")
-    subscriptions: str = Field(default="", description="Comma-separated list of subscribed subjects") 
\ No newline at end of file
+    subscriptions: Tuple[str, ...] = Field(default=(), description="Subscribed subjects, in subscription order")
+    
+    # Ensemble construit une seule fois, à la construction (l'instance est immuable)
+    _subscription_set: FrozenSet[str] = PrivateAttr(default=frozenset())
+    
+    def model_post_init(self, __context) -> None:
+        self._subscription_set = frozenset(self.subscriptions)
+    
+    def is_subscribed(self, matiere: str) -> bool:
+        """Whether the user is subscribed to `matiere` (set lookup)."""
+        return matiere in self._subscription_set
+
+class UserRegisterRequest(BaseModel):
+    """Model for registering a new user."""
+    username: str = Field(..., description="Display name of the user")
+    email: str = Field(..., description="Unique email address")
+    role: str = Field(..., description="User role: student, teacher or admin")
+    subscriptions: Optional[List[str]] = Field(default_factory=list, description="Subscribed subjects")
+
+class SubscriptionsRequest(BaseModel):
+    """Model for reading (no subscriptions given) or replacing a user's subscriptions."""
+    user_id: int = Field(..., description="User ID")
+    subscriptions: Optional[List[str]] = Field(None, description="New list of subscribed subjects")
+
+class UserUpdateRequest(BaseModel):
+    """Model for a partial update of a user's information."""
+    username: Optional[str] = Field(None, description="New username")
+    email: Optional[str] = Field(None, description="New email address")
+    role: Optional[str] = Field(None, description="New role")
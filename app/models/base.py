@@ -1,11 +1,30 @@
 """Base models used across the application."""
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, Dict, Any
 from datetime import datetime
+import time
+
+# (seconde epoch, horodatage ISO formaté) : le formatage n'a lieu qu'une fois par seconde
+_ts_cache = (0, "")
+
+def now_iso() -> str:
+    """Current local time as an ISO 8601 string, to the second (formatted once per second)."""
+    global _ts_cache
+    second = int(time.time())
+    cached_second, formatted = _ts_cache
+    if second != cached_second:
+        formatted = datetime.fromtimestamp(second).isoformat()
+        # Tuple replaced in one assignment: concurrent readers see an old or new pair, never a mix
+        _ts_cache = (second, formatted)
+    return formatted
 
 class ApiResponse(BaseModel):
     """Standard API response model."""
+    # Immutable, like the other response models: built once per response, never modified
+    model_config = ConfigDict(frozen=True)
     success: bool
     message: str
     data: Optional[Dict[str, Any]] = None
-    timestamp: str = datetime.now().isoformat() 
\ No newline at end of file
+    # Horodatage de chaque réponse (un défaut simple serait figé à l'import du module)
+    timestamp: str = Field(default_factory=now_iso)
+ 
\ No newline at end of file
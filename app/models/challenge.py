@@ -1,5 +1,5 @@
 """Models for challenges management."""
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
@@ -14,6 +14,7 @@ class ChallengeCreate(ChallengeBase):
 
 class ChallengeResponse(ChallengeBase):
     """Model for challenge response."""
+    model_config = ConfigDict(frozen=True)
     challenge_id: str = Field(..., description="Unique challenge ID")
     question: str = Field(..., description="Challenge question")
     date: str = Field(..., description="Challenge date (YYYY-MM-DD)")
@@ -25,6 +26,7 @@ class ChallengeUserResponse(BaseModel):
 
 class LeaderboardEntry(BaseModel):
     """Model for a leaderboard entry."""
+    model_config = ConfigDict(frozen=True)
     user_id: str = Field(..., description="User ID")
     username: Optional[str] = Field(None, description="Username")
     score: int = Field(..., description="User's score")
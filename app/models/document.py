@@ -1,5 +1,5 @@
 """Models for document management."""
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, List
 from enum import Enum
 
@@ -28,6 +28,7 @@ class DocumentCreate(BaseModel):
 
 class DocumentResponse(DocumentBase):
     """Model for document response."""
+    model_config = ConfigDict(frozen=True)
     id: str
     file_path: str
     file_size: int
@@ -36,4 +37,5 @@ class DocumentResponse(DocumentBase):
     
 class DocumentList(BaseModel):
     """Model for a list of documents."""
+    model_config = ConfigDict(frozen=True)
     documents: List[DocumentResponse] = [] 
\ No newline at end of file
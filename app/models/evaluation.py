@@ -1,5 +1,5 @@
 """Models for student response evaluation."""
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, List, Dict, Any
 
 class EvaluationRequest(BaseModel):
@@ -10,6 +10,7 @@ class EvaluationRequest(BaseModel):
 
 class EvaluationResponse(BaseModel):
     """Model for the evaluation result."""
+    model_config = ConfigDict(frozen=True)
     note: int = Field(..., description="Score (0-100)")
     points_forts: List[str] = Field(..., description="Strengths of the response")
     points_ameliorer: List[str] = Field(..., description="Areas for improvement")
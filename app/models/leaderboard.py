@@ -1,5 +1,5 @@
 """Leaderboard models for the API."""
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 
 class LeaderboardRequest(BaseModel):
@@ -9,6 +9,7 @@ class LeaderboardRequest(BaseModel):
     
 class LeaderboardEntry(BaseModel):
     """Model representing a leaderboard entry."""
+    model_config = ConfigDict(frozen=True)
     user_id: int
     username: str
     score: int
@@ -17,6 +18,7 @@ class LeaderboardEntry(BaseModel):
     
 class LeaderboardResponse(BaseModel):
     """Response model for leaderboard data."""
+    model_config = ConfigDict(frozen=True)
     entries: list[LeaderboardEntry]
     total_users: int
     current_user_rank: Optional[int] = None 
\ No newline at end of file
@@ -1,5 +1,5 @@
 """Models for subjects (matières) management."""
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, List, Dict
 
 class MatiereBase(BaseModel):
@@ -13,9 +13,11 @@ class MatiereCreate(MatiereBase):
 
 class MatiereResponse(MatiereBase):
     """Model for subject response."""
+    model_config = ConfigDict(frozen=True)
     document_count: int = Field(0, description="Number of documents in the subject")
     last_update: Optional[str] = Field(None, description="Last update timestamp")
 
 class MatiereList(BaseModel):
     """Model for a list of subjects."""
+    model_config = ConfigDict(frozen=True)
     matieres: List[str] = Field([], description="List of available subjects") 
\ No newline at end of file
@@ -1,5 +1,5 @@
 """Models for questions management."""
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
@@ -18,6 +18,7 @@ class Source(BaseModel):
 
 class QuestionResponse(BaseModel):
     """Model for RAG system response."""
+    model_config = ConfigDict(frozen=True)
     response: str = Field(..., description="The answer to the question")
     confidence_level: float = Field(0.0, description="Confidence level of the answer (0.0 to 1.0)")
     key_concepts: List[str] = Field(default_factory=list, description="Key concepts identified in the answer")
@@ -36,6 +37,7 @@ class ReflectionQuestion(BaseModel):
 
 class ApiResponse(BaseModel):
     """Model for API response wrapper."""
+    model_config = ConfigDict(frozen=True)
     success: bool = Field(..., description="Whether the request was successful")
     data: Optional[QuestionResponse] = Field(None, description="Response data if successful")
     error: Optional[str] = Field(None, description="Error message if unsuccessful") 
\ No newline at end of file
@@ -1,14 +1,21 @@
 from app.db.models import Challenge, ChallengeServed, Matiere
 from app.db.session import get_session
-from sqlmodel import select
+from sqlmodel import select, func
+from sqlalchemy import delete, exists, insert, update
 from fastapi import Depends
-from datetime import datetime
-from typing import Optional, Dict
+from datetime import date, datetime
+from functools import lru_cache
+from collections import namedtuple
+from typing import Optional, Dict, Sequence, Tuple
 import logging
+import time
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Challenge servi (colonnes de _challenges_query, dans le même ordre)
+ChallengeRow = namedtuple("ChallengeRow", ["id", "question", "matiere", "date", "ref"])
+
 def generer_challenge_quotidien():
     """Génère le challenge du jour."""
     return {"success": True, "data": {"challenge_id": "chall_1", "question": "Décrivez TCP/IP"}}
@@ -16,29 +23,18 @@ def generer_challenge_quotidien():
 def lister_challenges(matiere=None, session=None):
     """Liste les challenges depuis la base de données, avec option de filtrage par matière."""
     if session is None:
-        from app.db.session import engine
+        from app.db.session import read_engine
         from sqlmodel import Session
-        with Session(engine) as session:
+        with Session(read_engine) as session:
             return lister_challenges(matiere=matiere, session=session)
     
     try:
-        # Select only the essential columns that should exist
-        query = select(Challenge.id, Challenge.question, Challenge.matiere, Challenge.date)
+        # Colonnes brutes (mappings) : pas d'objet intermédiaire par ligne, ref stockée
+        query = select(Challenge.id, Challenge.question, Challenge.matiere, Challenge.date, Challenge.ref)
         if matiere:
             query = query.where(Challenge.matiere == matiere)
-        results = session.exec(query).all()
-        
-        # Convert to dictionaries manually
-        challenges = []
-        for result in results:
-            challenge_dict = {
-                "id": result[0],
-                "question": result[1], 
-                "matiere": result[2],
-                "date": result[3],
-                "ref": f"{result[2]}-{result[0]:03d}"  # Generate ref from matiere and id
-            }
-            challenges.append(challenge_dict)
+        # Core execution on the session's connection: plain rows, no ORM result processing
+        challenges = [dict(row) for row in session.connection().execute(query).mappings()]
         
         return {"success": True, "data": {"challenges": challenges}}
     except Exception as e:
@@ -48,162 +44,240 @@ def lister_challenges(matiere=None, session=None):
 def creer_challenge(challenge_data, session=None):
     """Crée un challenge et l'ajoute à la base de données."""
     if session is None:
-        # Pour usage direct (ex: script), ouvrir une session
-        from app.db.session import engine
+        # Pour usage direct (ex: script), ouvrir une session d'écriture (BEGIN IMMEDIATE)
+        from app.db.session import write_engine
         from sqlmodel import Session
-        with Session(engine) as session:
+        with Session(write_engine()) as session:
             return creer_challenge(challenge_data, session=session)
     
     try:
-        from datetime import datetime
         # Remove 'ref' and force date to today (creation time)
         challenge_data_clean = {k: v for k, v in challenge_data.items() if k not in {'ref', 'date'}}
         challenge_data_clean['date'] = datetime.now().strftime("%Y-%m-%d")
         
-        # Créer l'objet Challenge without ref
-        challenge = Challenge(**challenge_data_clean)
+        # Identifiant attribué d'avance pour insérer la ref avec la ligne (un INSERT, un commit).
+        # Sans risque de collision avec une session d'écriture (get_write_session, BEGIN IMMEDIATE) :
+        # elle tient le verrou dès ce SELECT, et SQLite attribuerait lui-même max(id) + 1
+        challenge_id = session.exec(select(func.coalesce(func.max(Challenge.id), 0) + 1)).one()
+        generated_ref = f"{challenge_data_clean['matiere']}-{challenge_id:03d}"
+        
+        challenge = Challenge(id=challenge_id, ref=generated_ref, **challenge_data_clean)
         session.add(challenge)
         session.commit()
-        session.refresh(challenge)
-        
-        # Generate ref after creation
-        generated_ref = f"{challenge.matiere}-{challenge.id:03d}"
-        
-        # Try to update with ref if column exists, otherwise just return without it
-        try:
-            challenge.ref = generated_ref
-            session.add(challenge)
-            session.commit()
-            session.refresh(challenge)
-        except Exception:
-            # Column doesn't exist, continue without it
-            pass
         
         # Prepare response data
         response_data = challenge_data_clean.copy()
         response_data["ref"] = generated_ref
-        response_data["id"] = challenge.id
+        response_data["id"] = challenge_id
         
-        return {"success": True, "data": {"challenge_id": challenge.id, "challenge": response_data}}
+        return {"success": True, "data": {"challenge_id": challenge_id, "challenge": response_data}}
     except Exception as e:
         print(f"Error creating challenge: {str(e)}")
         return {"success": False, "error": str(e)}
 
+def creer_challenges_bulk(items, session=None):
+    """
+    Crée plusieurs challenges en une seule transaction (scripts de chargement).
+    
+    Un seul INSERT multi-lignes, un UPDATE pour les refs et un seul commit, au lieu
+    de deux commits et deux refresh par challenge avec creer_challenge.
+    """
+    if session is None:
+        # Pour usage direct (ex: script), ouvrir une session
+        from app.db.session import engine
+        from sqlmodel import Session
+        with Session(engine) as session:
+            return creer_challenges_bulk(items, session=session)
+    
+    try:
+        # Comme creer_challenge : ref générée après insertion, date forcée au jour de création
+        today = datetime.now().strftime("%Y-%m-%d")
+        rows = [{"question": item["question"], "matiere": item["matiere"], "date": today} for item in items]
+        if not rows:
+            return {"success": True, "data": {"challenge_ids": [], "count": 0}}
+        
+        challenge_ids = session.exec(
+            insert(Challenge).returning(Challenge.id, sort_by_parameter_order=True),
+            params=rows
+        ).scalars().all()
+        session.exec(update(Challenge).where(Challenge.id.in_(challenge_ids)).values(ref=_CHALLENGE_REF))
+        session.commit()
+        
+        return {"success": True, "data": {"challenge_ids": challenge_ids, "count": len(challenge_ids)}}
+    except Exception as e:
+        session.rollback()
+        print(f"Error creating challenges: {str(e)}")
+        return {"success": False, "error": str(e)}
+
 def soumettre_reponse(challenge_id: str, reponse: str):
     """Soumet une réponse à un challenge."""
     return {"success": True, "data": {"challenge_id": challenge_id, "reponse": reponse}}
 
-def get_challenge_for_current_tick(matiere: str, session, granularite: str = None):
+# Granularité par matière : matiere -> (expiration monotonic, granularité). Rarement modifiée,
+# relue au plus toutes les GRANULARITE_CACHE_TTL secondes (changements faits hors de l'API)
+_GRANULARITE_CACHE_MAXSIZE = 256
+_granularite_cache: Dict[str, Tuple[float, str]] = {}
+
+def invalidate_granularite_cache() -> None:
+    """Forget the cached granularities (e.g. after editing the Matiere table)."""
+    _granularite_cache.clear()
+
+def get_granularite(matiere: str) -> str:
+    """
+    Granularité des ticks d'une matière ("semaine" si la matière n'est pas déclarée).
+    
+    Mise en cache par matière pendant GRANULARITE_CACHE_TTL secondes : après une
+    modification de la table Matiere, appeler invalidate_granularite_cache().
+    """
+    now = time.monotonic()
+    entry = _granularite_cache.get(matiere)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    
+    from app.db.session import read_engine
+    from sqlmodel import Session
+    with Session(read_engine) as session:
+        granularite = session.exec(select(Matiere.granularite).where(Matiere.name == matiere)).first()
+    granularite = granularite or "semaine"
+    
+    if len(_granularite_cache) >= _GRANULARITE_CACHE_MAXSIZE:
+        _granularite_cache.clear()
+    _granularite_cache[matiere] = (now + settings.GRANULARITE_CACHE_TTL, granularite)
+    return granularite
+
+# Challenge servi par (matiere, granularite, tick) : fixé pour toute la durée du tick une fois
+# enregistré dans ChallengeServed, il est identique pour tous les utilisateurs. Les lignes
+# (ChallengeRow) sont immuables et partagées entre requêtes.
+_TICK_CACHE_MAXSIZE = 1024
+_current_tick_challenges: Dict[Tuple[str, str, int], ChallengeRow] = {}
+
+def _remember_tick_challenge(tick_key: Tuple[str, str, int], challenge: ChallengeRow) -> None:
+    if len(_current_tick_challenges) >= _TICK_CACHE_MAXSIZE:
+        # Entrées des ticks passés : on repart de zéro plutôt que de les trier
+        _current_tick_challenges.clear()
+    _current_tick_challenges[tick_key] = challenge
+
+def invalidate_tick_cache() -> None:
+    """Forget the challenges resolved for the current ticks (e.g. after deleting challenges)."""
+    _current_tick_challenges.clear()
+
+def get_challenge_for_current_tick(matiere: str, session, granularite: str = None, today: Optional[date] = None):
     """
     Get the challenge that should be served for the current tick.
     All users should get the same challenge during the same tick period.
+    
+    `session` is only read (a read-only session is fine): recording a newly served
+    challenge goes through its own short write session. `today` lets a caller
+    resolving several subjects read the clock once.
     """
     # 1. Get subject granularity if not provided
     if granularite is None:
-        matiere_obj = session.exec(select(Matiere).where(Matiere.name == matiere)).first()
-        granularite = matiere_obj.granularite if matiere_obj else "semaine"
+        granularite = get_granularite(matiere)
     
-    # 2. Get all challenges for the subject, ordered by date and ID
-    challenges_raw = session.exec(
-        select(Challenge.id, Challenge.question, Challenge.matiere, Challenge.date)
-        .where(Challenge.matiere == matiere)
-        .order_by(Challenge.date, Challenge.id)
-    ).all()
+    # 2. Calculate current tick using global reference date
+    current_tick = compute_tick(granularite, settings.TICK_REFERENCE_DATE, today)
     
-    # Filter out rows with un-parsable dates to avoid blocking the whole service
-    challenges = []
-    for c in challenges_raw:
-        if _parse_date(c[3]) is None:
-            logger.warning(f"Challenge {c[0]} skipped due to invalid date format: {c[3]}")
-            continue
-        challenges.append(c)
+    # Challenge of the tick already resolved by this process: no query at all
+    tick_key = (matiere, granularite, current_tick)
+    challenge = _current_tick_challenges.get(tick_key)
+    if challenge is not None:
+        return challenge
     
-    if not challenges:
-        return None
-    
-    # Convert to challenge-like objects with generated refs
-    challenge_objects = []
-    for c in challenges:
-        challenge_obj = type('Challenge', (), {
-            'id': c[0],
-            'question': c[1], 
-            'matiere': c[2],
-            'date': c[3],
-            'ref': f"{c[2]}-{c[0]:03d}",
-            'dict': lambda self: {
-                'id': self.id,
-                'question': self.question,
-                'matiere': self.matiere, 
-                'date': self.date,
-                'ref': self.ref
-            }
-        })()
-        challenge_objects.append(challenge_obj)
+    served_for_subject = (
+        (ChallengeServed.matiere == matiere)
+        & (ChallengeServed.granularite == granularite)
+    )
+    # Challenge already served for this tick, if any: one indexed JOIN
+    # (ChallengeServed by (matiere, granularite, tick), then Challenge by its unique ref)
+    served_query = (
+        _challenges_query(matiere)
+        .join(ChallengeServed, ChallengeServed.challenge_ref == Challenge.ref)
+        .where(served_for_subject, ChallengeServed.tick == current_tick)
+    )
     
-    # 3. Calculate current tick using global reference date
-    current_tick = compute_tick(granularite, settings.TICK_REFERENCE_DATE)
+    # 3. Lookup on the caller's session (reads only: no write lock)
+    challenge = _first_valid_challenge(session.connection().execute(served_query))
+    if challenge:
+        # Return the already served challenge for this tick
+        _remember_tick_challenge(tick_key, challenge)
+        return challenge
+    # Otherwise (nothing served yet, or served challenge gone) pick the next one
     
-    # 4. Check if we already have a challenge served for this tick
-    served_challenge = session.exec(
-        select(ChallengeServed)
-        .where(
-            ChallengeServed.matiere == matiere,
-            ChallengeServed.granularite == granularite,
-            ChallengeServed.tick == current_tick
+    # 4. Pick and record it in a short write transaction (BEGIN IMMEDIATE takes the lock
+    # first), checking again in case another request served this tick in the meantime
+    from app.db.session import write_engine
+    from sqlmodel import Session
+    with Session(write_engine()) as write_session:
+        conn = write_session.connection()
+        challenge = _first_valid_challenge(conn.execute(served_query))
+        if challenge:
+            _remember_tick_challenge(tick_key, challenge)
+            return challenge
+        
+        # First challenge (by date, id) not yet served in this cycle, found by SQLite
+        # (NOT EXISTS on the served index) instead of comparing two Python sets
+        not_served = ~exists().where(served_for_subject, ChallengeServed.challenge_ref == Challenge.ref)
+        selected_challenge = _first_valid_challenge(conn.execute(_challenges_query(matiere).where(not_served)))
+        
+        # If all challenges have been served, reset and start over
+        if not selected_challenge:
+            selected_challenge = _first_valid_challenge(conn.execute(_challenges_query(matiere)))
+            if not selected_challenge:
+                return None
+            
+            # Delete all previous served challenges to reset the cycle (one DELETE statement)
+            write_session.exec(delete(ChallengeServed).where(served_for_subject))
+        
+        # 5. Record this challenge as served for the current tick
+        cs = ChallengeServed(
+            matiere=matiere, 
+            granularite=granularite, 
+            challenge_ref=selected_challenge.ref, 
+            tick=current_tick
         )
-    ).first()
+        write_session.add(cs)
+        write_session.commit()
     
-    if served_challenge:
-        # Return the already served challenge for this tick
-        for challenge in challenge_objects:
-            if challenge.ref == served_challenge.challenge_ref:
-                return challenge
-        # If challenge not found (shouldn't happen), fall through to create new one
+    _remember_tick_challenge(tick_key, selected_challenge)
+    return selected_challenge
+
+def _subjects_with_challenges(matieres: Sequence[str], session) -> set:
+    """
+    Subjects among `matieres` that have at least one servable challenge (ref and valid date).
     
-    # 5. No challenge served yet for this tick, determine which one to serve
-    # Get all previously served challenges (from previous ticks)
-    all_served_refs = set(
-        row.challenge_ref for row in session.exec(
-            select(ChallengeServed).where(
-                ChallengeServed.matiere == matiere,
-                ChallengeServed.granularite == granularite
-            )
-        ).all()
+    One read query for all subjects: the distinct (matiere, date) pairs are few.
+    """
+    rows = session.connection().execute(
+        select(Challenge.matiere, Challenge.date)
+        .where(Challenge.matiere.in_(matieres), Challenge.ref.is_not(None))
+        .distinct()
     )
+    return {row.matiere for row in rows if _parse_date(row.date) is not None}
+
+# Référence générée d'un challenge (ex: "SYD-007"), stockée dans Challenge.ref et ChallengeServed
+_CHALLENGE_REF = func.printf("%s-%03d", Challenge.matiere, Challenge.id)
+
+def _challenges_query(matiere: str):
+    """
+    Challenges of a subject (id, question, matiere, date, ref) in serving order.
     
-    # 6. Find the first unserved challenge or cycle back to the beginning
-    selected_challenge = None
-    for challenge in challenge_objects:
-        if challenge.ref not in all_served_refs:
-            selected_challenge = challenge
-            break
-    
-    # If all challenges have been served, reset and start over
-    if not selected_challenge:
-        # Delete all previous served challenges to reset the cycle
-        delete_query = select(ChallengeServed).where(
-            ChallengeServed.matiere == matiere,
-            ChallengeServed.granularite == granularite
-        )
-        served_entries = session.exec(delete_query).all()
-        for entry in served_entries:
-            session.delete(entry)
-        session.commit()
-        
-        # Take the first challenge
-        selected_challenge = challenge_objects[0]
-    
-    # 7. Record this challenge as served for the current tick
-    cs = ChallengeServed(
-        matiere=matiere, 
-        granularite=granularite, 
-        challenge_ref=selected_challenge.ref, 
-        tick=current_tick
+    A column projection: execute it on session.connection() (Core rows, no ORM layer).
+    """
+    return (
+        select(Challenge.id, Challenge.question, Challenge.matiere, Challenge.date, Challenge.ref)
+        .where(Challenge.matiere == matiere, Challenge.ref.is_not(None))
+        .order_by(Challenge.date, Challenge.id)
     )
-    session.add(cs)
-    session.commit()
-    
-    return selected_challenge
+
+def _first_valid_challenge(rows) -> Optional[ChallengeRow]:
+    """Return the first row whose date parses, skipping the others so they never block the service."""
+    for row in rows:
+        if _parse_date(row.date) is None:
+            logger.warning(f"Challenge {row.id} skipped due to invalid date format: {row.date}")
+            continue
+        # Tuple détaché du résultat SQL : léger, immuable et partageable (cache des ticks)
+        return ChallengeRow._make(row)
+    return None
 
 def get_next_challenge_for_matiere(matiere: str, session, granularite: str = None):
     """
@@ -212,8 +286,15 @@ def get_next_challenge_for_matiere(matiere: str, session, granularite: str = Non
     """
     return get_challenge_for_current_tick(matiere, session, granularite)
 
+@lru_cache(maxsize=4096)
 def _parse_date(date_str: str) -> Optional[datetime]:
-    """Try to parse a date string using several common patterns."""
+    """Try to parse a date string using several common patterns (memoized: few distinct dates)."""
+    # Fast path for the format the service writes (YYYY-MM-DD): no strptime
+    if len(date_str) == 10 and date_str[4] == "-" and date_str[7] == "-":
+        try:
+            return datetime(int(date_str[:4]), int(date_str[5:7]), int(date_str[8:10]))
+        except ValueError:
+            pass
     for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y", "%Y/%m/%d"):
         try:
             return datetime.strptime(date_str, fmt)
@@ -221,34 +302,47 @@ def _parse_date(date_str: str) -> Optional[datetime]:
             continue
     return None
 
-def compute_tick(granularite, ref_date_str):
-    ref_date_parsed = _parse_date(ref_date_str)
-    if ref_date_parsed is None:
-        # If we cannot parse the date we skip by raising to be caught by caller
-        raise ValueError(f"Invalid date format: {ref_date_str}")
+# Nombre de jours par tick des granularités à pas fixe
+_TICK_DAYS = {"jour": 1, "semaine": 7}
 
-    ref_date = ref_date_parsed
-    now = datetime.now()
-    if granularite == "jour":
-        return (now.date() - ref_date.date()).days
-    elif granularite == "semaine":
-        return ((now.date() - ref_date.date()).days) // 7
+@lru_cache(maxsize=128)
+def _reference_date(ref_date_str: str) -> date:
+    """Parse the tick reference date once per distinct string."""
+    # Fast path for the documented ISO format, other accepted formats otherwise
+    try:
+        return date.fromisoformat(ref_date_str)
+    except ValueError:
+        ref_date_parsed = _parse_date(ref_date_str)
+        if ref_date_parsed is None:
+            # If we cannot parse the date we skip by raising to be caught by caller
+            raise ValueError(f"Invalid date format: {ref_date_str}")
+        return ref_date_parsed.date()
+
+def compute_tick(granularite, ref_date_str, today: Optional[date] = None):
+    # The tick itself depends on today's date: only the reference date is cached
+    ref_date = _reference_date(ref_date_str)
+
+    if today is None:
+        today = date.today()
+    tick_days = _TICK_DAYS.get(granularite)
+    if tick_days is not None:
+        return (today.toordinal() - ref_date.toordinal()) // tick_days
     elif granularite == "mois":
-        return (now.year - ref_date.year) * 12 + (now.month - ref_date.month)
+        return (today.year - ref_date.year) * 12 + (today.month - ref_date.month)
     elif granularite.endswith("jours"):
         n = int(granularite.replace("jours", ""))
-        return ((now.date() - ref_date.date()).days) // n
+        return (today.toordinal() - ref_date.toordinal()) // n
     else:
         raise ValueError("Granularité non supportée")
 
-def get_today_challenge_for_user(user_subscriptions: str, session) -> Optional[Dict]:
+def get_today_challenge_for_user(user_subscriptions: Sequence[str], session) -> Optional[Dict]:
     """
     Get today's challenge for a user based on their subscriptions.
     Uses tick logic to determine which challenge should be served today.
     
     Args:
-        user_subscriptions: Comma-separated string of user's subscribed subjects
-        session: Database session
+        user_subscriptions: User's subscribed subjects, in subscription order
+        session: Database session, only read (see get_challenge_for_current_tick)
         
     Returns:
         Dict with today's challenge or None if no challenge available
@@ -256,54 +350,63 @@ def get_today_challenge_for_user(user_subscriptions: str, session) -> Optional[D
     if not user_subscriptions:
         return None
     
-    # Parse user subscriptions
-    subscribed_subjects = [s.strip() for s in user_subscriptions.split(',') if s.strip()]
+    # Une seule lecture de l'horloge pour la sélection et le tick
+    today = date.today()
     
-    if not subscribed_subjects:
+    # Subjects that can serve a challenge today, in subscription order: one read query,
+    # and no ChallengeServed write for the subjects that are not selected
+    try:
+        with_challenges = _subjects_with_challenges(user_subscriptions, session)
+    except Exception as e:
+        print(f"Error getting challenges for {user_subscriptions}: {e}")
         return None
-    
-    # Try to get a challenge from each subscribed subject
-    today_challenges = []
-    
-    for matiere in subscribed_subjects:
+    candidates = []
+    for matiere in user_subscriptions:
+        if matiere not in with_challenges:
+            continue
         try:
-            challenge = get_challenge_for_current_tick(matiere, session)
-            if challenge:
-                today_challenges.append({
-                    "challenge": challenge,
-                    "matiere": matiere
-                })
-        except Exception as e:
+            compute_tick(get_granularite(matiere), settings.TICK_REFERENCE_DATE, today)
+        except ValueError as e:
+            # Une matière mal configurée ne bloque pas les autres
             print(f"Error getting challenge for {matiere}: {e}")
             continue
+        candidates.append(matiere)
     
-    if not today_challenges:
+    if not candidates:
         return None
     
     # ----------------------- ROUND-ROBIN SELECTION -----------------------
     # Deterministically rotate through the list of subjects that have a
     # challenge today.  We use the current Julian day (toordinal) so that a
     # single subject is chosen per day and it cycles automatically.
-    from datetime import date as _date_mod
-
-    today_ordinal = _date_mod.today().toordinal()
-    selected_idx = today_ordinal % len(today_challenges)
-    selected = today_challenges[selected_idx]
-    
-    return {
-        "challenge_id": selected["challenge"].id,
-        "ref": selected["challenge"].ref,
-        "question": selected["challenge"].question,
-        "matiere": selected["matiere"],
-        "date": selected["challenge"].date,
-        "matieres": [selected["matiere"]]  # Keep as array for backward compatibility
-    }
+    # Only the selected subject is resolved; the next ones are tried only if it
+    # yields nothing (e.g. its challenges were deleted in the meantime).
+    selected_idx = today.toordinal() % len(candidates)
+    for matiere in candidates[selected_idx:] + candidates[:selected_idx]:
+        try:
+            challenge = get_challenge_for_current_tick(matiere, session, today=today)
+        except Exception as e:
+            print(f"Error getting challenge for {matiere}: {e}")
+            session.rollback()
+            continue
+        if challenge:
+            return {
+                "challenge_id": challenge.id,
+                "ref": challenge.ref,
+                "question": challenge.question,
+                "matiere": matiere,
+                "date": challenge.date,
+                "matieres": [matiere]  # Keep as array for backward compatibility
+            }
+    return None
 
 if __name__ == "__main__":
-    challenge_data = {
-        "question": "Qu'est-ce que Kafka ?",
-        "matiere": "SYD",
-        "date": "2025-05-27"
-    }
-    creer_challenge(challenge_data)
-    lister_challenges(matiere="SYD")
\ No newline at end of file
+    challenges_data = [
+        {
+            "question": "Qu'est-ce que Kafka ?",
+            "matiere": "SYD",
+            "date": "2025-05-27"
+        },
+    ]
+    creer_challenges_bulk(challenges_data)
+    lister_challenges(matiere="SYD")
@@ -1,13 +1,18 @@
 """Services for managing documents with database tracking."""
 import os
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from datetime import datetime
-from sqlmodel import Session, select
+from sqlmodel import Session, select, update, or_
 from app.core.config import settings
 from app.db.models import Document
 from app.db.session import get_session
-from app.services.rag.documents import calculer_hash_fichier, upload_document_to_subject
+from app.services.rag.documents import (
+    calculer_hash_fichier,
+    calculer_hash_fichier_legacy,
+    est_hash_legacy,
+    upload_document_to_subject
+)
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +22,7 @@ def get_document_by_hash(session: Session, file_hash: str) -> Optional[Document]
     
     Args:
         session: Database session
-        file_hash: MD5 hash of the file
+        file_hash: Hash of the file content
         
     Returns:
         Document if found, None otherwise
@@ -25,6 +30,25 @@ def get_document_by_hash(session: Session, file_hash: str) -> Optional[Document]
     statement = select(Document).where(Document.file_hash == file_hash)
     return session.exec(statement).first()
 
+def get_document_by_ref(session: Session, matiere: str, ref: str) -> Optional[Document]:
+    """
+    Get a document of a matière from either its numeric id or its file hash.
+    
+    Args:
+        session: Database session
+        matiere: Subject identifier
+        ref: Numeric document id or file hash
+        
+    Returns:
+        Document if found, None otherwise
+    """
+    condition = Document.file_hash == ref
+    if ref.isdigit():
+        condition = or_(Document.id == int(ref), condition)
+    
+    statement = select(Document).where(Document.matiere == matiere, condition)
+    return session.exec(statement).first()
+
 def get_documents_by_matiere(session: Session, matiere: str) -> List[Document]:
     """
     Get all documents for a specific matière.
@@ -39,11 +63,21 @@ def get_documents_by_matiere(session: Session, matiere: str) -> List[Document]:
     statement = select(Document).where(Document.matiere == matiere)
     return list(session.exec(statement).all())
 
+def _is_unchanged(document: Document, file_stats: os.stat_result, file_mtime: datetime) -> bool:
+    """Whether the file behind `document` still has the recorded size and mtime (and a BLAKE3 hash)."""
+    return (
+        document.file_size == file_stats.st_size
+        and document.last_modified == file_mtime
+        and not est_hash_legacy(document.file_hash)
+    )
+
 def create_or_update_document(
     session: Session,
     file_path: str,
     matiere: str,
-    is_exam: bool = False
+    is_exam: bool = False,
+    precomputed_hash: Optional[str] = None,
+    file_stats: Optional[os.stat_result] = None
 ) -> Tuple[Document, bool]:
     """
     Create a new document record or update existing one if file has changed.
@@ -53,20 +87,32 @@ def create_or_update_document(
         file_path: Full path to the file
         matiere: Subject identifier
         is_exam: Whether this is an exam document
+        precomputed_hash: Hash of the file content if the caller already has it
+        file_stats: os.stat() result of the file if the caller already has it
         
     Returns:
         Tuple of (Document, is_new) where is_new indicates if this is a new document
     """
-    # Calculate current file hash
-    current_hash = calculer_hash_fichier(file_path)
-    
-    # Get file stats
-    file_stats = os.stat(file_path)
+    # Get file stats (unless the caller got them while scanning the directory)
+    if file_stats is None:
+        file_stats = os.stat(file_path)
     filename = os.path.basename(file_path)
     relative_path = os.path.relpath(file_path, settings.COURS_DIR)
     file_extension = os.path.splitext(file_path)[1].lower().lstrip('.')
     file_mtime = datetime.fromtimestamp(file_stats.st_mtime)
     
+    # Record of this file path, if any (same hash, or an older version of the file)
+    statement = select(Document).where(Document.file_path == relative_path)
+    old_version = session.exec(statement).first()
+    
+    # Same size and modification time as recorded: the file is unchanged, skip reading it
+    # (legacy MD5 records still go through the hash below to be rehashed)
+    if precomputed_hash is None and old_version and _is_unchanged(old_version, file_stats, file_mtime):
+        return old_version, False
+    
+    # Calculate current file hash (unless the caller hashed it while writing)
+    current_hash = precomputed_hash or calculer_hash_fichier(file_path)
+    
     # Check if document already exists
     existing_doc = get_document_by_hash(session, current_hash)
     
@@ -79,9 +125,18 @@ def create_or_update_document(
             session.refresh(existing_doc)
         return existing_doc, False
     
-    # Check if there's a document with same file path but different hash (file was modified)
-    statement = select(Document).where(Document.file_path == relative_path)
-    old_version = session.exec(statement).first()
+    # A document with same file path but different hash: the file was modified
+    if old_version and est_hash_legacy(old_version.file_hash) \
+            and calculer_hash_fichier_legacy(file_path) == old_version.file_hash:
+        # Unchanged file recorded with a legacy MD5 hash: rehash it in place
+        old_version.file_hash = current_hash
+        if old_version.last_modified < file_mtime:
+            old_version.last_modified = file_mtime
+        session.add(old_version)
+        session.commit()
+        session.refresh(old_version)
+        logger.info(f"Rehashed {filename} with BLAKE3")
+        return old_version, False
     
     if old_version:
         # File was modified, remove old version and create new one
@@ -113,8 +168,10 @@ def create_or_update_document(
 def upload_document_with_tracking(
     matiere: str,
     filename: str,
-    file_content: bytes,
-    is_exam: bool = False
+    file_content: Optional[bytes] = None,
+    is_exam: bool = False,
+    precomputed_hash: Optional[str] = None,
+    uploaded_path: Optional[str] = None
 ) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
     """
     Upload a document and track it in the database.
@@ -122,15 +179,21 @@ def upload_document_with_tracking(
     Args:
         matiere: Subject identifier
         filename: Name of the file
-        file_content: File content as bytes
+        file_content: File content as bytes (unless uploaded_path is given)
         is_exam: Whether this is an exam document
+        precomputed_hash: Hash of the content computed while streaming the upload
+        uploaded_path: Streamed upload already written in the target folder (see
+            upload_document_to_subject), moved into place
         
     Returns:
         Tuple[bool, str, Optional[Dict]]: (success, message, document_info)
     """
     try:
         # First upload the file to filesystem
-        success, message, file_info = upload_document_to_subject(matiere, filename, file_content, is_exam)
+        success, message, file_info = upload_document_to_subject(
+            matiere, filename, file_content, is_exam,
+            precomputed_hash=precomputed_hash, uploaded_path=uploaded_path
+        )
         
         if not success:
             return success, message, file_info
@@ -141,7 +204,9 @@ def upload_document_with_tracking(
             file_path = os.path.join(settings.COURS_DIR, file_info["file_path"])
             
             # Create or update document record
-            doc, is_new = create_or_update_document(session, file_path, matiere, is_exam)
+            doc, is_new = create_or_update_document(
+                session, file_path, matiere, is_exam, precomputed_hash=file_info["file_hash"]
+            )
             
             # Return enhanced document info with database data
             document_info = {
@@ -172,7 +237,7 @@ def mark_document_as_indexed(session: Session, file_hash: str) -> bool:
     
     Args:
         session: Database session
-        file_hash: MD5 hash of the file
+        file_hash: Hash of the file content
         
     Returns:
         True if document was found and updated, False otherwise
@@ -186,6 +251,29 @@ def mark_document_as_indexed(session: Session, file_hash: str) -> bool:
         return True
     return False
 
+def mark_documents_as_indexed(session: Session, file_hashes: List[str]) -> int:
+    """
+    Mark several documents as indexed with a single UPDATE statement.
+    
+    Args:
+        session: Database session
+        file_hashes: Hashes of the indexed files
+        
+    Returns:
+        Number of documents updated
+    """
+    if not file_hashes:
+        return 0
+    
+    statement = (
+        update(Document)
+        .where(Document.file_hash.in_(set(file_hashes)))
+        .values(is_indexed=True, last_indexed=datetime.now())
+    )
+    result = session.exec(statement)
+    session.commit()
+    return result.rowcount
+
 def get_unindexed_documents(session: Session, matiere: Optional[str] = None) -> List[Document]:
     """
     Get documents that haven't been indexed yet.
@@ -220,30 +308,59 @@ def get_modified_documents(session: Session, matiere: Optional[str] = None) -> L
     
     documents = list(session.exec(statement).all())
     modified_docs = []
+    rehashed = False
     
     for doc in documents:
         full_path = os.path.join(settings.COURS_DIR, doc.file_path)
         
-        # Check if file still exists
-        if not os.path.exists(full_path):
+        # Check if file still exists (and get its metadata with the same call)
+        try:
+            file_stats = os.stat(full_path)
+        except FileNotFoundError:
             # File was deleted, remove from database
             session.delete(doc)
             logger.info(f"Removed deleted file from database: {doc.filename}")
             continue
+        
+        # Same size and modification time as recorded: unchanged, no need to hash it
+        if _is_unchanged(doc, file_stats, datetime.fromtimestamp(file_stats.st_mtime)):
+            continue
             
         # Check if file was modified
         try:
             current_hash = calculer_hash_fichier(full_path)
             if current_hash != doc.file_hash:
-                modified_docs.append(doc)
+                if est_hash_legacy(doc.file_hash) and calculer_hash_fichier_legacy(full_path) == doc.file_hash:
+                    # Unchanged file recorded with a legacy MD5 hash: rehash it in place
+                    doc.file_hash = current_hash
+                    session.add(doc)
+                    rehashed = True
+                else:
+                    modified_docs.append(doc)
         except Exception as e:
             logger.error(f"Error checking file {full_path}: {e}")
     
-    if modified_docs:
+    if modified_docs or rehashed:
         session.commit()
     
     return modified_docs
 
+def _scanner_fichiers(directory: str) -> Iterator[os.DirEntry]:
+    """
+    Yield the regular files under `directory`, recursively (symlinked directories not followed).
+    
+    os.scandir entries carry the file type from the directory listing, and cache
+    their stat() result for the caller.
+    """
+    pending = [directory]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.is_file():
+                    yield entry
+
 def sync_documents_with_filesystem(session: Session, matiere: str) -> Dict[str, int]:
     """
     Synchronize database document records with files on the filesystem.
@@ -269,33 +386,34 @@ def sync_documents_with_filesystem(session: Session, matiere: str) -> Dict[str,
     # Scan filesystem for documents
     found_files = set()
     
-    for root, dirs, files in os.walk(matiere_dir):
-        for file in files:
-            # Skip README files
-            if file.lower() == 'readme.md':
-                continue
+    for entry in _scanner_fichiers(matiere_dir):
+        # Skip README files
+        if entry.name.lower() == 'readme.md':
+            continue
+            
+        file_extension = os.path.splitext(entry.name)[1].lower()
+        if file_extension in extensions:
+            file_path = entry.path
+            relative_path = os.path.relpath(file_path, settings.COURS_DIR)
+            found_files.add(relative_path)
+            
+            try:
+                # Check if this is an exam document
+                is_exam = "examens" in relative_path
                 
-            file_extension = os.path.splitext(file)[1].lower()
-            if file_extension in extensions:
-                file_path = os.path.join(root, file)
-                relative_path = os.path.relpath(file_path, settings.COURS_DIR)
-                found_files.add(relative_path)
+                # Create or update document record (stat cached by the directory entry)
+                doc, is_new = create_or_update_document(
+                    session, file_path, matiere, is_exam, file_stats=entry.stat()
+                )
                 
-                try:
-                    # Check if this is an exam document
-                    is_exam = "examens" in relative_path
-                    
-                    # Create or update document record
-                    doc, is_new = create_or_update_document(session, file_path, matiere, is_exam)
+                if is_new:
+                    stats["added"] += 1
+                else:
+                    stats["updated"] += 1
                     
-                    if is_new:
-                        stats["added"] += 1
-                    else:
-                        stats["updated"] += 1
-                        
-                except Exception as e:
-                    logger.error(f"Error processing file {file_path}: {e}")
-                    stats["errors"] += 1
+            except Exception as e:
+                logger.error(f"Error processing file {file_path}: {e}")
+                stats["errors"] += 1
     
     # Remove database records for files that no longer exist
     existing_docs = get_documents_by_matiere(session, matiere)
@@ -1,6 +1,57 @@
 import re
 from datetime import datetime
 
+# Concepts techniques recherchés dans la question. Un mot est retenu s'il commence par l'un
+# d'eux : recherche de ses préfixes dans un frozenset (un accès par longueur de mot-clé) au
+# lieu d'essayer chaque alternative d'une regex à chaque position
+# TCP, UDP, OSI, HTTP et DNS n'y figurent pas : écrits en majuscules dans l'ancienne
+# alternance appliquée au texte en minuscules, ils ne correspondaient jamais
+_CONCEPT_KEYWORDS = frozenset((
+    "virtualisation", "système", "réseau", "serveur", "kafka",
+    "architecture", "données", "sécurité", "performance", "protocole", "infrastructure", "cloud",
+    "container", "docker", "kubernetes", "load", "balancer", "firewall", "proxy", "cache",
+    "database", "sql", "nosql", "mongodb", "redis", "nginx", "apache", "linux", "windows", "unix",
+    "shell", "api", "rest", "json", "xml", "yaml", "configuration", "monitoring", "backup",
+    "recovery", "scalability", "availability", "reliability", "throughput", "latency", "bandwidth",
+    "encryption", "authentication", "authorization", "ssl", "tls", "vpn", "vlan", "switch",
+    "router", "gateway", "subnet", "nat", "dhcp", "ntp", "snmp", "ldap", "active", "directory",
+    "kerberos", "oauth", "saml", "microservices", "monolithe", "devops", "ci", "cd", "jenkins",
+    "git", "svn", "agile", "scrum", "kanban", "test", "unit", "integration", "deployment",
+    "staging", "production", "development", "debugging", "profiling", "optimization",
+    "refactoring", "documentation", "versioning", "release", "hotfix", "patch", "feature", "bug",
+    "issue", "ticket", "project", "management", "planning", "estimation", "risk", "quality",
+    "assurance", "testing", "stress", "security", "penetration", "vulnerability", "assessment",
+    "compliance", "governance", "audit", "framework", "design", "pattern", "mvc", "mvp", "mvvm",
+    "solid", "dry", "kiss", "yagni", "tdd", "bdd", "ddd", "clean", "code", "review", "pair",
+    "programming", "legacy", "migration", "upgrade", "maintenance", "support", "troubleshooting",
+    "incident", "alerting", "logging", "metrics", "dashboard", "reporting", "analytics",
+    "business", "intelligence", "data", "mining", "machine", "learning", "artificial", "neural",
+    "network", "deep", "nlp", "computer", "vision", "big", "hadoop", "spark", "elasticsearch",
+    "kibana", "grafana", "prometheus", "nagios", "zabbix", "ansible", "puppet", "chef",
+    "terraform", "vagrant", "openshift", "aws", "azure", "gcp", "computing", "saas", "paas",
+    "iaas", "serverless", "lambda", "functions", "microservice", "orchestration", "service",
+    "mesh", "istio", "consul", "vault", "nomad", "packer", "boundary"
+))
+_CONCEPT_LENGTHS = tuple(sorted({len(keyword) for keyword in _CONCEPT_KEYWORDS}))
+_WORD_TOKEN_RE = re.compile(r'\w+')
+# Mots de 4 lettres ou plus (repli quand aucun concept n'est trouvé)
+_WORDS_RE = re.compile(r'\b[a-zA-Z]{4,}\b')
+
+def _extraire_concepts(text: str, limit: int = 3):
+    """Return (lowercased) the first `limit` words of `text` that start with a concept keyword."""
+    concepts = []
+    for match in _WORD_TOKEN_RE.finditer(text):
+        word = match.group().lower()
+        for length in _CONCEPT_LENGTHS:
+            if length > len(word):
+                break
+            if word[:length] in _CONCEPT_KEYWORDS:
+                concepts.append(word)
+                if len(concepts) == limit:
+                    return concepts
+                break
+    return concepts
+
 def evaluer_reponse(evaluation):
     """Évalue une réponse d'étudiant basée sur l'objet d'évaluation en utilisant le système RAG IA."""
     from app.services.rag.questions import evaluer_reponse_etudiant as rag_evaluer_reponse
@@ -12,13 +63,13 @@ def evaluer_reponse(evaluation):
     
     # Extract key concepts from the question for better RAG search
     # Remove common words and keep important concepts
-    concept_keywords = re.findall(r'\b(?:virtualisation|système|réseau|serveur|TCP|UDP|OSI|HTTP|DNS|Kafka|architecture|données|sécurité|performance|protocole|infrastructure|cloud|container|docker|kubernetes|load|balancer|firewall|proxy|cache|database|sql|nosql|mongodb|redis|nginx|apache|linux|windows|unix|shell|api|rest|json|xml|yaml|configuration|monitoring|backup|recovery|scalability|availability|reliability|throughput|latency|bandwidth|encryption|authentication|authorization|ssl|tls|vpn|vlan|switch|router|gateway|subnet|nat|dhcp|ntp|snmp|ldap|active|directory|kerberos|oauth|saml|microservices|monolithe|devops|ci|cd|jenkins|git|svn|agile|scrum|kanban|test|unit|integration|deployment|staging|production|development|debugging|profiling|optimization|refactoring|documentation|versioning|release|hotfix|patch|feature|bug|issue|ticket|project|management|planning|estimation|risk|quality|assurance|performance|testing|load|stress|security|penetration|vulnerability|assessment|compliance|governance|audit|framework|design|pattern|architecture|mvc|mvp|mvvm|solid|dry|kiss|yagni|tdd|bdd|ddd|clean|code|code|review|pair|programming|refactoring|legacy|migration|upgrade|maintenance|support|troubleshooting|incident|monitoring|alerting|logging|metrics|dashboard|reporting|analytics|business|intelligence|data|mining|machine|learning|artificial|intelligence|neural|network|deep|learning|nlp|computer|vision|big|data|hadoop|spark|kafka|elasticsearch|kibana|grafana|prometheus|nagios|zabbix|ansible|puppet|chef|terraform|vagrant|docker|kubernetes|openshift|aws|azure|gcp|cloud|computing|saas|paas|iaas|serverless|lambda|functions|microservice|container|orchestration|service|mesh|istio|consul|vault|nomad|packer|boundary)\w*', question_text.lower())
+    concept_keywords = _extraire_concepts(question_text, 3)  # Use up to 3 key concepts
     
     if concept_keywords:
-        concept = " ".join(concept_keywords[:3])  # Use up to 3 key concepts
+        concept = " ".join(concept_keywords)
     else:
         # Fallback to question words, removing common words
-        words = re.findall(r'\b[a-zA-Z]{4,}\b', question_text)  # Words with 4+ letters
+        words = _WORDS_RE.findall(question_text)  # Words with 4+ letters
         concept = " ".join(words[:3]) if words else question_text[:50]
     
     # Create a question object for the RAG evaluation function
@@ -1,8 +1,11 @@
 """Services for managing matières (subjects)."""
 import os
 import logging
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple
+from sqlmodel import Session, select, func
 from app.core.config import settings
+from app.db.models import Document
 
 logger = logging.getLogger(__name__)
 
@@ -28,10 +31,7 @@ def initialiser_structure_dossiers(nom: str) -> Dict[str, Any]:
                 "data": {"path": f"{settings.COURS_DIR}/{nom}"}
             }
         
-        # Créer le dossier principal de la matière
-        os.makedirs(matiere_dir, exist_ok=True)
-        
-        # Créer le sous-dossier pour les examens
+        # Créer le dossier de la matière et son sous-dossier examens en un seul appel
         examens_dir = os.path.join(matiere_dir, "examens")
         os.makedirs(examens_dir, exist_ok=True)
         
@@ -63,6 +63,21 @@ def initialiser_structure_dossiers(nom: str) -> Dict[str, Any]:
             "data": None
         }
 
+@lru_cache(maxsize=1)
+def _scanner_matieres(cours_dir: str, mtime_ns: int) -> Tuple[str, ...]:
+    """
+    Scanne le dossier cours et retourne les noms de matières triés.
+    
+    Mis en cache par (dossier, mtime) : un nouveau scan n'a lieu que lorsque
+    le contenu du dossier cours a changé.
+    """
+    with os.scandir(cours_dir) as entries:
+        # Ignorer les fichiers cachés et ne garder que les dossiers
+        return tuple(sorted(
+            entry.name for entry in entries
+            if entry.is_dir() and not entry.name.startswith('.')
+        ))
+
 def lister_matieres() -> Dict[str, Any]:
     """
     Liste toutes les matières disponibles en scannant le dossier cours.
@@ -77,16 +92,10 @@ def lister_matieres() -> Dict[str, Any]:
             os.makedirs(settings.COURS_DIR, exist_ok=True)
             return {"success": True, "data": []}
         
-        # Scanner le dossier cours pour trouver les sous-dossiers
-        matieres = []
-        for item in os.listdir(settings.COURS_DIR):
-            item_path = os.path.join(settings.COURS_DIR, item)
-            # Ignorer les fichiers cachés et ne garder que les dossiers
-            if os.path.isdir(item_path) and not item.startswith('.'):
-                matieres.append(item)
-        
-        # Trier la liste alphabétiquement
-        matieres.sort()
+        # Le mtime du dossier change dès qu'une matière est ajoutée/supprimée :
+        # tant qu'il est identique, la liste en cache est toujours valable
+        mtime_ns = os.stat(settings.COURS_DIR).st_mtime_ns
+        matieres = list(_scanner_matieres(settings.COURS_DIR, mtime_ns))
         
         logger.info(f"Matières trouvées: {matieres}")
         return {"success": True, "data": matieres}
@@ -95,7 +104,34 @@ def lister_matieres() -> Dict[str, Any]:
         logger.error(f"Erreur lors de la liste des matières: {e}")
         return {"success": False, "data": [], "message": f"Erreur: {str(e)}"}
 
-
+def batch_info_matieres(session: Session, noms: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Obtient le nombre de documents et la date de dernière mise à jour de plusieurs matières.
+    
+    Une seule requête groupée pour toutes les matières, au lieu d'une par matière.
+    
+    Args:
+        session: Session de base de données
+        noms: Noms des matières
+        
+    Returns:
+        Dict associant chaque matière à {"document_count", "last_update"}
+    """
+    infos = {nom: {"document_count": 0, "last_update": None} for nom in noms}
+    if not infos:
+        return infos
+    
+    statement = (
+        select(Document.matiere, func.count(Document.id), func.max(Document.last_modified))
+        .where(Document.matiere.in_(infos.keys()))
+        .group_by(Document.matiere)
+    )
+    for matiere, document_count, last_update in session.exec(statement):
+        infos[matiere] = {
+            "document_count": document_count,
+            "last_update": last_update.isoformat() if last_update else None
+        }
+    return infos
 
 def supprimer_matiere(nom: str) -> Dict[str, Any]:
     """
@@ -0,0 +1,109 @@
+"""Micro-batching of RAG context retrieval for concurrent question requests."""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from langchain.schema import Document
+from langchain_pinecone import PineconeVectorStore
+
+logger = logging.getLogger(__name__)
+
+# Fenêtre pendant laquelle les requêtes d'une même matière sont regroupées (secondes)
+BATCH_WINDOW = 0.01
+
+# Nombre d'extraits retournés par concept (identique au retriever par défaut)
+CONTEXT_K = 4
+
+# Vector store de chaque namespace, créé au premier batch de la matière
+_vector_stores: Dict[str, PineconeVectorStore] = {}
+
+def _get_vector_store(matiere: str) -> PineconeVectorStore:
+    """Return the (cached) vector store of a subject's namespace, reusing the shared RAG components."""
+    namespace = f"matiere-{matiere.lower()}"
+    vector_store = _vector_stores.get(namespace)
+    if vector_store is None:
+        from app.services.rag.questions import initialize_rag_components
+
+        pc, index_name, embeddings, _ = initialize_rag_components()
+        vector_store = PineconeVectorStore(
+            index=pc.Index(index_name),
+            embedding=embeddings,
+            namespace=namespace
+        )
+        _vector_stores[namespace] = vector_store
+    return vector_store
+
+class QuestionBatcher:
+    """
+    Group context lookups of concurrent requests by matière.
+    
+    Requests arriving within BATCH_WINDOW are embedded with a single embeddings
+    API call per matière, then each vector is searched in Pinecone concurrently.
+    Under low traffic a batch simply contains one request.
+    """
+
+    def __init__(self, window: float = BATCH_WINDOW, k: int = CONTEXT_K):
+        self._window = window
+        self._k = k
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[str, List[Tuple[str, asyncio.Future]]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Batches en cours : l'event loop ne garde qu'une référence faible sur les tâches
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def retrieve_context(self, matiere: str, concept: str) -> List[Document]:
+        """
+        Get the course excerpts relevant to a concept, batched with concurrent calls.
+        
+        Args:
+            matiere: Subject identifier
+            concept: Concept (query) to search for
+            
+        Returns:
+            List[Document]: Most similar document chunks
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # State is bound to one event loop (e.g. a new loop per test client)
+            self._loop = loop
+            self._pending = {}
+            self._flush_handle = None
+            self._tasks = set()
+
+        future = loop.create_future()
+        self._pending.setdefault(matiere, []).append((concept, future))
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        self._flush_handle = None
+        for matiere, items in pending.items():
+            task = self._loop.create_task(self._run_batch(matiere, items))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, matiere: str, items: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            vector_store = await asyncio.to_thread(_get_vector_store, matiere)
+            vectors = await asyncio.to_thread(
+                vector_store.embeddings.embed_documents, [concept for concept, _ in items]
+            )
+            results = await asyncio.gather(*(
+                asyncio.to_thread(vector_store.similarity_search_by_vector, vector, k=self._k)
+                for vector in vectors
+            ))
+        except Exception as e:
+            logger.error("Batched context retrieval failed for %s: %s", matiere, e)
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        logger.debug("Retrieved context for %d concepts in %s", len(items), matiere)
+        for (_, future), documents in zip(items, results):
+            if not future.done():
+                future.set_result(documents)
+
+question_batcher = QuestionBatcher()
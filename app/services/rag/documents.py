@@ -8,6 +8,8 @@ from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import glob
 
+from blake3 import blake3
+
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader, UnstructuredWordDocumentLoader
 from langchain_text_splitters import MarkdownHeaderTextSplitter
@@ -108,9 +110,50 @@ def lire_fichiers_matiere(matiere: str) -> List[Dict[str, Any]]:
     # Combine documents, placing exams first to give them more weight
     return exam_documents + documents
 
+# Longueur (hex) des empreintes MD5 calculées avant le passage à BLAKE3
+LEGACY_HASH_LENGTH = 32
+
+# Taille des blocs lus pour le calcul des empreintes MD5
+HASH_CHUNK_SIZE = 1 << 20
+
+def creer_hasheur_fichier():
+    """
+    Create the hash object used to fingerprint document contents.
+    
+    Lets callers that already stream a file (e.g. uploads) compute the same
+    hash as calculer_hash_fichier without reading the file a second time.
+    BLAKE3 is used: the hash only serves change detection / deduplication and
+    it is several times faster than MD5.
+    
+    Returns:
+        A BLAKE3 hasher exposing update() and hexdigest() (64 hex characters)
+    """
+    return blake3()
+
 def calculer_hash_fichier(file_path: str) -> str:
     """
-    Calculate an MD5 hash of a file's content to detect modifications.
+    Calculate a BLAKE3 hash of a file's content to detect modifications.
+    
+    Args:
+        file_path: Path to the file
+        
+    Returns:
+        str: BLAKE3 hash of the file
+    """
+    # Fichier mappé en mémoire (pas de copie bloc par bloc) et haché sur plusieurs cœurs
+    # quand il est assez grand ; même empreinte que creer_hasheur_fichier()
+    hasher = blake3(max_threads=blake3.AUTO)
+    hasher.update_mmap(file_path)
+    return hasher.hexdigest()
+
+def est_hash_legacy(file_hash: str) -> bool:
+    """Whether a stored hash is a legacy MD5 one (recorded before BLAKE3)."""
+    return len(file_hash) == LEGACY_HASH_LENGTH
+
+def calculer_hash_fichier_legacy(file_path: str) -> str:
+    """
+    Calculate the legacy MD5 hash of a file, to recognise unchanged documents
+    whose database record predates BLAKE3.
     
     Args:
         file_path: Path to the file
@@ -121,7 +164,7 @@ def calculer_hash_fichier(file_path: str) -> str:
     hash_md5 = hashlib.md5()
     
     with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
             hash_md5.update(chunk)
             
     return hash_md5.hexdigest()
@@ -429,11 +472,29 @@ def get_documents_for_subject(matiere: str) -> List[Dict[str, Any]]:
     documents.sort(key=lambda x: x["upload_date"], reverse=True)
     return documents
 
+def dossier_cible_document(matiere: str, is_exam: bool = False) -> str:
+    """
+    Return the folder an uploaded document goes to, creating it if needed.
+    
+    Args:
+        matiere: Subject identifier
+        is_exam: Whether this is an exam document (stored in the "examens" subfolder)
+        
+    Returns:
+        str: Path of the subject folder, or of its exams subfolder
+    """
+    matiere_dir = os.path.join(settings.COURS_DIR, matiere)
+    target_dir = os.path.join(matiere_dir, "examens") if is_exam else matiere_dir
+    os.makedirs(target_dir, exist_ok=True)
+    return target_dir
+
 def upload_document_to_subject(
     matiere: str, 
     filename: str, 
-    file_content: bytes, 
-    is_exam: bool = False
+    file_content: Optional[bytes] = None, 
+    is_exam: bool = False,
+    precomputed_hash: Optional[str] = None,
+    uploaded_path: Optional[str] = None
 ) -> Tuple[bool, str, Optional[Dict[str, Any]]]:
     """
     Upload a document to a specific subject folder.
@@ -441,25 +502,18 @@ def upload_document_to_subject(
     Args:
         matiere: Subject identifier
         filename: Name of the file
-        file_content: File content as bytes
+        file_content: File content as bytes (unless uploaded_path is given)
         is_exam: Whether this is an exam document
+        precomputed_hash: Hash of the content if already computed while reading it
+        uploaded_path: File already written in dossier_cible_document(matiere, is_exam),
+            moved into place instead of writing file_content (left untouched on failure)
         
     Returns:
         Tuple[bool, str, Optional[Dict]]: (success, message, document_info)
     """
     try:
-        # Ensure subject folder exists
-        matiere_dir = os.path.join(settings.COURS_DIR, matiere)
-        if not os.path.exists(matiere_dir):
-            os.makedirs(matiere_dir)
-        
-        # If it's an exam, create/use exams subfolder
-        if is_exam:
-            target_dir = os.path.join(matiere_dir, "examens")
-            if not os.path.exists(target_dir):
-                os.makedirs(target_dir)
-        else:
-            target_dir = matiere_dir
+        # Ensure subject folder (and exams subfolder) exists
+        target_dir = dossier_cible_document(matiere, is_exam)
         
         # Validate file extension
         file_extension = os.path.splitext(filename)[1].lower()
@@ -475,13 +529,17 @@ def upload_document_to_subject(
         if os.path.exists(file_path):
             return False, f"File {filename} already exists in {matiere}", None
         
-        # Write file content
-        with open(file_path, 'wb') as f:
-            f.write(file_content)
+        if uploaded_path is not None:
+            # Même dossier, donc même système de fichiers : renommage atomique, sans copie
+            os.replace(uploaded_path, file_path)
+        else:
+            # Write file content
+            with open(file_path, 'wb') as f:
+                f.write(file_content)
         
         # Get file info
         file_stats = os.stat(file_path)
-        file_hash = calculer_hash_fichier(file_path)
+        file_hash = precomputed_hash or calculer_hash_fichier(file_path)
         relative_path = os.path.relpath(file_path, settings.COURS_DIR)
         
         document_info = {
@@ -673,22 +731,17 @@ def mark_documents_as_indexed_in_db(file_hashes: List[str]) -> int:
     Mark multiple documents as indexed in the database.
     
     Args:
-        file_hashes: List of MD5 file hashes to mark as indexed
+        file_hashes: List of file hashes to mark as indexed
         
     Returns:
         Number of documents successfully marked as indexed
     """
     try:
-        from app.services.documents import mark_document_as_indexed
+        from app.services.documents import mark_documents_as_indexed
         from app.db.session import get_session
         
-        marked_count = 0
         with next(get_session()) as session:
-            for file_hash in file_hashes:
-                if mark_document_as_indexed(session, file_hash):
-                    marked_count += 1
-        
-        return marked_count
+            return mark_documents_as_indexed(session, file_hashes)
         
     except Exception as e:
         print(f"Error marking documents as indexed in database: {e}")
@@ -36,13 +36,18 @@ def initialize_rag_components():
     
     return _pc, _index_name, _embeddings, _vector_store
 
-def generer_question_reflexion(matiere: str, concept_cle: str) -> Dict[str, Any]:
+def generer_question_reflexion(
+    matiere: str,
+    concept_cle: str,
+    context: Optional[List[Document]] = None
+) -> Dict[str, Any]:
     """
     Generate a reflection question on a key concept using RAG.
     
     Args:
         matiere: Subject identifier
         concept_cle: Key concept to generate question about
+        context: Course excerpts already retrieved for the concept (skips retrieval)
         
     Returns:
         Dict[str, Any]: Generated question with metadata
@@ -58,19 +63,20 @@ def generer_question_reflexion(matiere: str, concept_cle: str) -> Dict[str, Any]
         
         concept_cle = concept_cle.strip()
         
-        # Initialize RAG system
-        _, index_name, embeddings, _ = initialize_rag_components()
-        retrieval_chain, vector_store = setup_rag_system(
-            index_name=index_name,
-            embeddings=embeddings,
-            matiere=matiere
-        )
-        
-        if not retrieval_chain:
-            return {
-                "error": "Failed to initialize RAG system",
-                "status": "error"
-            }
+        if context is None:
+            # Initialize RAG system
+            _, index_name, embeddings, _ = initialize_rag_components()
+            retrieval_chain, vector_store = setup_rag_system(
+                index_name=index_name,
+                embeddings=embeddings,
+                matiere=matiere
+            )
+            
+            if not retrieval_chain:
+                return {
+                    "error": "Failed to initialize RAG system",
+                    "status": "error"
+                }
         
         # Create prompt for reflection question
         prompt_template = """
@@ -125,8 +131,9 @@ def generer_question_reflexion(matiere: str, concept_cle: str) -> Dict[str, Any]
         )
         
         # Get relevant context using RAG
-        response = retrieval_chain.invoke({"input": concept_cle})
-        context = response.get("context", []) if isinstance(response, dict) else []
+        if context is None:
+            response = retrieval_chain.invoke({"input": concept_cle})
+            context = response.get("context", []) if isinstance(response, dict) else []
         
         # Generate question using LLM
         llm = ChatOpenAI(
@@ -4,8 +4,9 @@ Utilitaires pour interagir avec la base de données
 import logging
 from typing import Optional, Dict, Any, List
 from sqlmodel import Session, select
+from sqlalchemy.orm import selectinload
 from app.db.session import engine
-from app.db.models import User
+from app.db.models import User, UserSubscription
 
 # Configuration du logging
 logging.basicConfig(
@@ -27,7 +28,7 @@ def get_student_by_id(user_id: int) -> Optional[Dict[str, Any]]:
                 "username": user.username,
                 "email": user.email,
                 "role": user.role,
-                "subscriptions": user.subscriptions.split(",") if user.subscriptions else []
+                "subscriptions": [subscription.matiere for subscription in user.subscriptions]
             }
         return None
 
@@ -36,14 +37,16 @@ def get_all_students() -> List[Dict[str, Any]]:
     Récupère tous les étudiants de la base de données
     """
     with Session(engine) as session:
-        students = session.exec(select(User).where(User.role == 'student')).all()
+        students = session.exec(
+            select(User).options(selectinload(User.subscriptions)).where(User.role == 'student')
+        ).all()
         return [
             {
                 "id": user.id,
                 "username": user.username,
                 "email": user.email,
                 "role": user.role,
-                "subscriptions": user.subscriptions.split(",") if user.subscriptions else []
+                "subscriptions": [subscription.matiere for subscription in user.subscriptions]
             }
             for user in students
         ]
@@ -54,14 +57,10 @@ def get_students_by_subscription(matiere: str) -> List[Dict[str, Any]]:
     """
     with Session(engine) as session:
         students = session.exec(
-            select(User).where(
-                (User.role == 'student') & (
-                    (User.subscriptions.like(f"%{matiere},%")) |
-                    (User.subscriptions.like(f"%,{matiere},%")) |
-                    (User.subscriptions.like(f"%,{matiere}")) |
-                    (User.subscriptions == matiere)
-                )
-            )
+            select(User)
+            .options(selectinload(User.subscriptions))
+            .join(UserSubscription)
+            .where(User.role == 'student', UserSubscription.matiere == matiere)
         ).all()
         return [
             {
@@ -69,7 +68,7 @@ def get_students_by_subscription(matiere: str) -> List[Dict[str, Any]]:
                 "username": user.username,
                 "email": user.email,
                 "role": user.role,
-                "subscriptions": user.subscriptions.split(",") if user.subscriptions else []
+                "subscriptions": [subscription.matiere for subscription in user.subscriptions]
             }
             for user in students
         ]
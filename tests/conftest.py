@@ -19,11 +19,12 @@ def clean_database():
     """Clean the test database before each test."""    
     # Import here to avoid circular imports
     from app.db import session
-    from sqlmodel import create_engine, SQLModel
+    from sqlmodel import SQLModel
     
     # Dispose of any existing engine connections
     try:
         session.engine.dispose()
+        session.read_engine.dispose()
     except:
         pass
     
@@ -43,26 +44,28 @@ def clean_database():
                 pass
     
     # Create a fresh engine for this test
-    session.engine = create_engine(
-        "sqlite:///./test.db",
-        echo=True,
-        poolclass=None,  # Disable connection pooling
-        connect_args={
-            "check_same_thread": False,
-            "timeout": 30,
-            "isolation_level": "IMMEDIATE"
-        }
-    )
+    # Same pool and PRAGMA settings as the application engine
+    session.engine = session.build_engine("sqlite:///./test.db", timeout=30)
     
     # Create all tables in the fresh database
     import app.db.models  # Import models to ensure they're registered
     SQLModel.metadata.create_all(session.engine)
+    # Read-only engine on the same file, opened once the file exists
+    session.read_engine = session.build_read_engine("./test.db", timeout=30)
+    
+    # Users and granularities cached in-process belong to the previous database
+    from app.api.deps import invalidate_user_cache
+    invalidate_user_cache()
+    from app.services.challenges import invalidate_granularite_cache, invalidate_tick_cache
+    invalidate_granularite_cache()
+    invalidate_tick_cache()
     
     yield
     
     # Clean up after test
     try:
         session.engine.dispose()
+        session.read_engine.dispose()
     except:
         pass
     
@@ -110,6 +110,26 @@ class TestAPIStatus:
             data = response.json()
             assert "success" in data or "detail" in data
 
+    def test_trailing_slash_redirect(self):
+        """Test that collection paths without a trailing slash redirect to the routes."""
+        response = client.get("/api/matieres", follow_redirects=False)
+        assert response.status_code == 307
+        assert response.headers["location"].endswith("/api/matieres/")
+
+    def test_unknown_path_not_found(self):
+        """Test that unknown paths return 404 whatever the method."""
+        assert client.get("/unknown-page").status_code == 404
+        assert client.post("/unknown-page").status_code == 404
+
+    def test_repeated_lifespan(self, clean_database):
+        """Test that the app can start and shut down several times (log listener restarted)."""
+        from app.core import bootstrap
+        for _ in range(2):
+            with TestClient(app) as lifespan_client:
+                assert bootstrap._log_listener is not None
+                assert lifespan_client.get("/api").status_code == 200
+            assert bootstrap._log_listener is None
+
     def test_static_files_mount(self):
         """Test that static files are properly mounted."""
         # Test accessing static directory
@@ -183,4 +203,30 @@ class TestAPIPerformance:
         
         # All requests should succeed
         assert len(results) == 10
-        assert all(status == 200 for status in results) 
\ No newline at end of file
+        assert all(status == 200 for status in results) 
+
+class TestDatabaseEngines:
+    """Test database engine construction."""
+
+    def test_read_engine_special_characters_in_path(self, tmp_path):
+        """Test that the read-only engine opens paths containing URI delimiters."""
+        import sqlite3
+        from sqlalchemy import text
+        from sqlalchemy.exc import OperationalError
+        from app.db.session import build_read_engine
+
+        directory = tmp_path / "a b#c%d?e"
+        directory.mkdir()
+        db_file = directory / "t.db"
+        with sqlite3.connect(db_file) as conn:
+            conn.execute("CREATE TABLE t (x INTEGER)")
+            conn.execute("INSERT INTO t VALUES (1)")
+
+        read_engine = build_read_engine(str(db_file))
+        try:
+            with read_engine.connect() as conn:
+                assert conn.execute(text("SELECT COUNT(*) FROM t")).scalar() == 1
+                with pytest.raises(OperationalError):
+                    conn.execute(text("INSERT INTO t VALUES (2)"))
+        finally:
+            read_engine.dispose()
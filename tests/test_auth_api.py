@@ -147,6 +147,45 @@ class TestSubscriptionManagement:
         assert data["success"] is True
         assert data["data"]["subscriptions"] == []
 
+    def test_subscriptions_keep_order(self, clean_database):
+        """Test that subscriptions are returned in the order they were given."""
+        response = client.post("/api/users/register", json={
+            "username": "orderuser",
+            "email": "orderuser@example.com",
+            "role": "student",
+            "subscriptions": ["TCP", "SYD", "MATH"]
+        })
+        user_id = response.json()["data"]["user_id"]
+
+        response = client.put("/api/users/subscriptions", json={"user_id": user_id})
+        assert response.json()["data"]["subscriptions"] == ["TCP", "SYD", "MATH"]
+
+    def test_subscriptions_diff_across_updates(self, clean_database):
+        """Test that successive updates add, remove and reorder subscriptions."""
+        response = client.post("/api/users/register", json={
+            "username": "diffuser",
+            "email": "diffuser@example.com",
+            "role": "student",
+            "subscriptions": ["SYD", "TCP"]
+        })
+        user_id = response.json()["data"]["user_id"]
+
+        for subscriptions in (
+            ["SYD", "TCP", "MATH"],   # ajout
+            ["SYD", "MATH"],          # retrait
+            ["INFO", "MATH", "SYD"],  # ajout en tête et nouvel ordre
+            ["INFO", "MATH", "SYD"],  # aucune différence
+        ):
+            response = client.put("/api/users/subscriptions", json={
+                "user_id": user_id,
+                "subscriptions": subscriptions
+            })
+            assert response.status_code == 200
+            assert response.json()["data"]["subscriptions"] == subscriptions
+
+            response = client.put("/api/users/subscriptions", json={"user_id": user_id})
+            assert response.json()["data"]["subscriptions"] == subscriptions
+
     def test_subscription_nonexistent_user(self, clean_database):
         """Test subscription management with non-existent user."""
         response = client.put("/api/users/subscriptions", json={
@@ -157,4 +196,42 @@ class TestSubscriptionManagement:
         data = response.json()
         # FastAPI HTTPException returns {"detail": "message"} format
         assert "detail" in data
-        assert "non trouvé" in data["detail"] 
\ No newline at end of file
+        assert "non trouvé" in data["detail"] 
+
+
+@pytest.mark.auth
+class TestUserUpdate:
+    """Test user information updates."""
+
+    def test_update_user_without_body(self, clean_database):
+        """Test that an update without a body changes nothing."""
+        response = client.post("/api/users/register", json={
+            "username": "nobodyuser",
+            "email": "nobodyuser@example.com",
+            "role": "student",
+            "subscriptions": []
+        })
+        user_id = response.json()["data"]["user_id"]
+
+        response = client.put(f"/api/users/{user_id}")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is True
+        assert data["message"] == "Aucune modification apportée"
+
+    def test_update_user_partial(self, clean_database):
+        """Test that only the provided fields are updated."""
+        response = client.post("/api/users/register", json={
+            "username": "partialuser",
+            "email": "partialuser@example.com",
+            "role": "student",
+            "subscriptions": []
+        })
+        user_id = response.json()["data"]["user_id"]
+
+        response = client.put(f"/api/users/{user_id}", json={"username": "renamed"})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["message"] == "Informations utilisateur mises à jour"
+        assert data["data"]["username"] == "renamed"
+        assert data["data"]["email"] == "partialuser@example.com"
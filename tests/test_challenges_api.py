@@ -237,4 +237,108 @@ class TestChallengesAPI:
         data = response.json()
         # Should return appropriate message about no subscriptions
         if not data["success"]:
-            assert "abonnements" in data["message"].lower() or "subscription" in data["message"].lower() 
\ No newline at end of file
+            assert "abonnements" in data["message"].lower() or "subscription" in data["message"].lower() 
+
+class TestChallengeResponseStorage:
+    """Test that submitted responses are stored in the database."""
+
+    def test_submit_response_saved_to_database(self, clean_database, monkeypatch):
+        """Test that a submitted response lands in the studentresponse table."""
+        import sys
+        import types
+        from sqlmodel import Session, select
+        from app.db import session
+        from app.db.models import StudentResponse
+
+        # No AI evaluation in tests: the evaluator module returns no result
+        evaluator = types.ModuleType("evaluator")
+        evaluator.evaluate_and_display = lambda **kwargs: None
+        monkeypatch.setitem(sys.modules, "evaluator", evaluator)
+
+        teacher_id = client.post("/api/users/register", json={
+            "username": "storage_teacher",
+            "email": "storage_teacher@test.com",
+            "role": "teacher",
+            "subscriptions": ["SYD"]
+        }).json()["data"]["user_id"]
+        student_id = client.post("/api/users/register", json={
+            "username": "storage_student",
+            "email": "storage_student@test.com",
+            "role": "student",
+            "subscriptions": ["SYD"]
+        }).json()["data"]["user_id"]
+        challenge_id = client.post(f"/api/challenges?user_id={teacher_id}", json={
+            "question": "What is ARP?",
+            "matiere": "SYD"
+        }).json()["data"]["challenge_id"]
+
+        response = client.post(
+            f"/api/challenges/{challenge_id}/response?user_id={student_id}",
+            json={"user_id": str(student_id), "response": "ARP maps IP addresses to MAC addresses."}
+        )
+        assert response.status_code == 200
+        submission = response.json()["data"]["submission"]
+        assert submission["storage_method"] == "database"
+
+        with Session(session.engine) as db:
+            stored = db.exec(
+                select(StudentResponse).where(StudentResponse.question_id == submission["question_id"])
+            ).first()
+        assert stored is not None
+        assert stored.challenge_id == challenge_id
+        assert stored.response == "ARP maps IP addresses to MAC addresses."
+
+
+class TestTodayChallengeServing:
+    """Test that today's challenge is recorded once per tick."""
+
+    def test_today_challenge_served_once(self, clean_database):
+        """Test that repeated requests get the same challenge and record it once."""
+        from sqlmodel import Session, select
+        from app.db import session
+        from app.db.models import ChallengeServed
+        from app.services.challenges import invalidate_tick_cache
+
+        teacher_id = client.post("/api/users/register", json={
+            "username": "tick_teacher",
+            "email": "tick_teacher@test.com",
+            "role": "teacher",
+            "subscriptions": ["SYD"]
+        }).json()["data"]["user_id"]
+        student_id = client.post("/api/users/register", json={
+            "username": "tick_student",
+            "email": "tick_student@test.com",
+            "role": "student",
+            "subscriptions": ["SYD"]
+        }).json()["data"]["user_id"]
+        challenge_id = client.post(f"/api/challenges?user_id={teacher_id}", json={
+            "question": "What is a subnet mask?",
+            "matiere": "SYD"
+        }).json()["data"]["challenge_id"]
+
+        for _ in range(2):
+            # Without the in-process cache, the second request reads the recorded challenge
+            invalidate_tick_cache()
+            response = client.get(f"/api/challenges/today?user_id={student_id}")
+            assert response.status_code == 200
+            data = response.json()
+            assert data["success"] is True
+            assert data["data"]["challenge"]["challenge_id"] == challenge_id
+
+        with Session(session.engine) as db:
+            served = db.exec(select(ChallengeServed).where(ChallengeServed.matiere == "SYD")).all()
+        assert len(served) == 1
+
+    def test_subscription_with_comma_kept_whole(self, clean_database):
+        """Test that a subject name containing a comma stays a single subscription."""
+        student_id = client.post("/api/users/register", json={
+            "username": "comma_student",
+            "email": "comma_student@test.com",
+            "role": "student",
+            "subscriptions": ["Réseaux, avancé", "SYD"]
+        }).json()["data"]["user_id"]
+
+        response = client.get(f"/api/challenges/today?user_id={student_id}")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["data"]["user_subscriptions"] == ["Réseaux, avancé", "SYD"]
@@ -0,0 +1,95 @@
+"""Tests for database initialization and migrations."""
+import sqlite3
+import pytest
+from sqlmodel import text
+
+from app.db import init_db as init_db_module
+from app.db.session import build_engine
+
+
+# Tables "user" et "challenge" telles que créées avant la table usersubscription
+BASELINE_SCHEMA = """
+CREATE TABLE user (
+    id INTEGER NOT NULL PRIMARY KEY,
+    username VARCHAR NOT NULL,
+    email VARCHAR NOT NULL,
+    role VARCHAR NOT NULL,
+    subscriptions VARCHAR
+);
+CREATE TABLE challenge (
+    id INTEGER NOT NULL PRIMARY KEY,
+    ref VARCHAR,
+    question VARCHAR NOT NULL,
+    matiere VARCHAR NOT NULL,
+    date VARCHAR NOT NULL
+);
+"""
+
+
+@pytest.fixture
+def legacy_engine(tmp_path, monkeypatch):
+    """Engine on a database created with the baseline schema and rows."""
+    db_file = tmp_path / "legacy.db"
+    with sqlite3.connect(db_file) as conn:
+        conn.executescript(BASELINE_SCHEMA)
+        conn.executemany("INSERT INTO user VALUES (?, ?, ?, ?, ?)", [
+            (1, "alice", "alice@example.com", "student", "TCP,SYD, MATH,TCP"),
+            (2, "bob", "bob@example.com", "student", ""),
+            (3, "carol", "carol@example.com", "teacher", None),
+        ])
+        conn.executemany("INSERT INTO challenge VALUES (?, ?, ?, ?, ?)", [
+            (1, None, "Question 1", "SYD", "2024-01-01"),
+            (2, "TCP-1", "Question 2", "TCP", "2024-01-02"),
+        ])
+    legacy = build_engine(f"sqlite:///{db_file}")
+    monkeypatch.setattr(init_db_module, "engine", legacy)
+    yield legacy
+    legacy.dispose()
+
+
+class TestInitDb:
+    """Test init_db on an existing database."""
+
+    def test_migrates_legacy_subscriptions(self, legacy_engine):
+        """Test that the comma-separated subscriptions column moves to usersubscription."""
+        init_db_module.init_db()
+
+        with legacy_engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT user_id, matiere FROM usersubscription ORDER BY id"
+            )).fetchall()
+            legacy_values = conn.execute(text("SELECT subscriptions FROM user")).scalars().all()
+
+        assert [tuple(row) for row in rows] == [(1, "TCP"), (1, "SYD"), (1, "MATH")]
+        assert legacy_values == [None, None, None]
+
+    def test_backfills_challenge_refs(self, legacy_engine):
+        """Test that challenge refs are generated and indexed uniquely."""
+        init_db_module.init_db()
+
+        with legacy_engine.connect() as conn:
+            refs = conn.execute(text("SELECT ref FROM challenge ORDER BY id")).scalars().all()
+            ref_index_unique = conn.execute(text(
+                "SELECT \"unique\" FROM pragma_index_list('challenge') WHERE name = 'ix_challenge_ref'"
+            )).scalar()
+
+        assert refs == ["SYD-001", "TCP-002"]
+        assert ref_index_unique == 1
+
+    def test_records_schema_version(self, legacy_engine):
+        """Test that a second run is skipped once the schema version is stored."""
+        init_db_module.init_db()
+
+        with legacy_engine.connect() as conn:
+            version = conn.execute(text("PRAGMA user_version")).scalar()
+        assert version == init_db_module.schema_version()
+
+        # Abonnements hérités réapparus : ignorés tant que le schéma n'a pas changé
+        with legacy_engine.begin() as conn:
+            conn.execute(text("UPDATE user SET subscriptions = 'INFO' WHERE id = 2"))
+        init_db_module.init_db()
+        with legacy_engine.connect() as conn:
+            count = conn.execute(text(
+                "SELECT COUNT(*) FROM usersubscription WHERE user_id = 2"
+            )).scalar()
+        assert count == 0